@@ -1,5 +1,6 @@
+import os
 import sys
-import io
+import json
 import requests
 import folium
 import time
@@ -8,8 +9,21 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, 
     QVBoxLayout, QSplitter, QPushButton
 )
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import QTimer, Qt
+try:
+    from PyQt5.QtWebEngineWidgets import QWebEngineView
+except ImportError:
+    QWebEngineView = None # Only needed for MAP_VIEW = 'web'
+from PyQt5.QtCore import QTimer, Qt, QObject, QThread, QMetaObject, pyqtSignal, pyqtSlot
+from branca.element import MacroElement
+from jinja2 import Template
+from ADSB_snapshot_log import SnapshotRecorder, read_recording
+from ADSB_perf import StageTimer
+from ADSB_core import (
+    AdsbCore, MultiFeedPoller, SpatialGrid, TrackStore, grid_clusters, make_feed_poller,
+    load_state_feature, mercator_pixels, place_labels,
+)
+from ADSB_radar_scope import RadarScope
+import numpy as np
 
 # Matplotlib imports for plotting
 # import matplotlib # REMOVED
@@ -37,7 +51,15 @@ PI_IP_ADDRESS = "XXX.XXX.X.XXX"  # <-- CHANGE THIS
 # If you use a different port, change it here.
 # DATA_URL = f"http://{PI_IP_ADDRESS}:8080/data/aircraft.json"
 # DATA_URL = f"http://{PI_IP_ADDRESS}/dump1090-fa/data/aircraft.json"
+# DATA_URL = "http://127.0.0.1:8504/data/aircraft.json"  # ADSB_fake_receiver.py (synthetic traffic)
 DATA_URL = f"http://{PI_IP_ADDRESS}:8504/data/aircraft.json"
+# Streaming alternative: dump1090's SBS-1 (BaseStation) output. Aircraft are
+# updated per message, so UPDATE_INTERVAL_MS can go well below 1000.
+# DATA_URL = f"sbs://{PI_IP_ADDRESS}:30003"
+# Or raw Mode-S, decoded here: Beast binary (port 30005) or AVR hex (30002).
+# Positions are resolved against RECEIVER_LAT/RECEIVER_LON.
+# DATA_URL = f"beast://{PI_IP_ADDRESS}:30005"
+# DATA_URL = f"avr://{PI_IP_ADDRESS}:30002"
 
 # 4. Map Zoom Level
 # 9 is a good starting point for a ~50-mile radius.
@@ -65,6 +87,93 @@ KEEP_ALL_TRACKS = 0
 # 1 = Yes, 0 = No
 PLOT_AIRPORTS = 1
 
+# 10. State Outline Cache
+# State outlines are downloaded once, simplified, and stored here.
+# Later launches start without network access; copy this folder along
+# with the script to run fully offline.
+STATE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state_cache")
+
+# 11. State Outline Simplification (degrees)
+# 0.001 deg is roughly 100 m, which is invisible at the zoom levels used
+STATE_SIMPLIFY_TOLERANCE = 0.001
+
+# 12. Persistent Track Limits (only used when KEEP_ALL_TRACKS = 1)
+# Tracks are dropped when no position has been seen for TRACK_MAX_AGE_S,
+# then least-recently-seen first to stay within TRACK_MAX_COUNT tracks
+# and TRACK_MEMORY_BUDGET_MB of track memory. 0 = no limit.
+TRACK_MAX_AGE_S = 3600
+TRACK_MAX_COUNT = 2000
+TRACK_MEMORY_BUDGET_MB = 64
+
+# 13. Snapshot Recording
+# Set to a folder name to record every new aircraft.json snapshot into
+# compressed log files there; None = off. A new file is started every
+# RECORD_ROTATE_MB megabytes or RECORD_ROTATE_MINUTES minutes.
+RECORD_DIR = None
+RECORD_ROTATE_MB = 64
+RECORD_ROTATE_MINUTES = 60
+
+# 14. Replay
+# Set REPLAY_PATH to a snapshot log, a folder of snapshot logs, or a folder
+# of aircraft.json files to replay it instead of polling DATA_URL.
+# REPLAY_SPEED: 1 = real time, 10 = ten times faster, 0 = as fast as possible
+REPLAY_PATH = None
+REPLAY_SPEED = 1
+
+# 15. Performance Timing
+# Every update is timed per stage (HTTP, parse, processing, map).
+# PERF_OVERLAY = 1 shows rolling p50/p95 times (ms) next to the aircraft count.
+# PERF_CSV = path of a CSV file to append one row of stage times per update.
+# PERF_WINDOW is the number of recent updates the percentiles cover.
+PERF_OVERLAY = 0
+PERF_CSV = None
+PERF_WINDOW = 300
+
+# 16. Multiple Receivers
+# Extra aircraft.json URLs to poll alongside DATA_URL. All feeds are polled
+# concurrently and merged by hex (the freshest position wins). One update
+# waits at most FEED_TIMEOUT_S for a slow receiver; keep it below
+# UPDATE_INTERVAL_MS. Per-feed contribution and latency are printed
+# every FEED_REPORT_S seconds.
+EXTRA_DATA_URLS = []
+# EXTRA_DATA_URLS = ["http://192.168.4.94:8504/data/aircraft.json"]
+FEED_TIMEOUT_S = 0.8
+FEED_REPORT_S = 60
+
+# 17. Viewport Culling (0 = No, 1 = Yes)
+# Only aircraft, tracks and airports inside the visible map area, grown by
+# CULL_MARGIN of its size on every side, are sent to the page; the rest are
+# dropped from it until the map is panned or zoomed back over them.
+# CULL_GRID_DEG is the cell size of the spatial index.
+CULL_TO_VIEW = 1
+CULL_MARGIN = 0.25
+CULL_GRID_DEG = 0.25
+
+# 18. Level of Detail (0 = No, 1 = Yes)
+# At zoom CLUSTER_MAX_ZOOM and below, aircraft within the same CLUSTER_PX
+# square on screen are drawn as one marker showing their count (click it
+# to zoom in). At any zoom, a label that would overlap one already placed
+# is hidden; labels already on screen keep their place.
+LOD_ENABLED = 1
+CLUSTER_MAX_ZOOM = 8
+CLUSTER_PX = 40
+
+# 19. Map Renderer
+# 'svg': every aircraft marker, label and trail is its own Leaflet layer.
+# 'canvas': aircraft, labels and trails are drawn together on one canvas,
+# redrawn after each update; far lighter on the page with many aircraft.
+MAP_RENDERER = 'svg'
+# MAP_RENDERER = 'canvas'
+
+# 20. Map View
+# 'native': a Qt radar scope (QGraphicsView); no browser engine, so it is
+# the light choice for a Raspberry Pi display. Pan by dragging, zoom with
+# the wheel or the +/- buttons, click an aircraft for its details.
+# 'web': the Leaflet page in a QWebEngineView (needs QtWebEngine);
+# MAP_RENDERER only applies to this one.
+MAP_VIEW = 'native'
+# MAP_VIEW = 'web'
+
 # --- END CONFIGURATION ---
 
 # --- Constants ---
@@ -74,6 +183,28 @@ DCA_VOR_LON = -77.036389
 SFRA_RADIUS_METERS = 55560 # 30 NM
 FRZ_RADIUS_METERS = 27780  # 15 NM
 
+# Distance rings around the receiver: (radius in meters, label)
+RANGE_RINGS = [
+    (80467/5, " 10 mi"),    # 10 miles
+    (2*80467/5, "20 mi"), # 20 miles
+    (3*80467/5, "30 mi"), # 30 miles
+    (4*80467/5, "40 mi"), # 40 miles
+    (80467, "50 mi")     # 50 miles
+]
+DEG_LAT_PER_METER = 1 / 111111 # Approx
+
+# Approximate on-screen size (px) of an aircraft label, for decluttering
+LABEL_BOX_PX = (110, 30)
+
+# How often the map page is asked for its visible bounds and zoom (ms)
+MAP_VIEW_POLL_MS = 250
+
+# Longest a +/- zoom may take to show up in the reported view (s)
+MAP_ZOOM_SETTLE_S = 2.0
+
+# Stages timed by the StageTimer (and the CSV columns, in order)
+PERF_STAGES = ['http', 'parse', 'process', 'update_map', 'map_page', 'total']
+
 # Airport Locations (approx. 200mi from DC)
 # Format: "CODE": (Latitude, Longitude, "towered" or "untowered")
 AIRPORT_LOCATIONS = {
@@ -131,10 +262,495 @@ AIRPORT_LOCATIONS = {
 
 # REMOVED AdsbMapCanvas class
 
+class AdsbMapBridge(MacroElement):
+    """
+    JavaScript side of the persistent map page.
+
+    The page is loaded once; afterwards update_map() only pushes a small
+    JSON patch through window.adsbUpdate() and the markers, labels and
+    track lines already on the page are moved in place. After every pan or
+    zoom the page keeps its visible bounds and zoom for window.adsbView(),
+    which the tracker polls, so update_map() can leave out what is
+    off-screen.
+
+    With renderer='canvas' the same patches update plain JS objects
+    instead, and one canvas layer draws every aircraft, label and trail
+    from them. Clusters and airports stay Leaflet markers in both modes.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var airportLayer = L.layerGroup().addTo(map);
+            {% if this.renderer != 'canvas' %}
+            var trackLayer = L.layerGroup().addTo(map);
+            var markerLayer = L.layerGroup().addTo(map);
+            {% endif %}
+            var clusterLayer = L.layerGroup().addTo(map);
+            var labelLayer = L.layerGroup();
+            if ({{ this.show_labels|tojson }}) { labelLayer.addTo(map); }
+            var trackStyle = {{ this.track_style|tojson }};
+            var markers = {}, labels = {}, tracks = {}, airports = {}, clusters = {};
+
+            function esc(txt) {
+                return String(txt).replace(/[&<>"]/g, function(c) {
+                    return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c];
+                });
+            }
+            function popupHtml(a) {
+                return '<b>Flight: ' + esc(a[3]) + '</b><br>' +
+                       'Altitude: ' + a[4] + ' ft<br>' +
+                       'Hex: ' + esc(a[0].toUpperCase());
+            }
+            function labelIcon(a) {
+                return L.divIcon({
+                    className: 'empty',
+                    iconSize: [150, 36],
+                    iconAnchor: [0, 0],
+                    html: '<div style="font-size: 9pt; font-weight: 500; color: #00FF00; margin-left: 10px; margin-top: -7px; line-height: 1.2;">' +
+                          '<span style="white-space: nowrap;">' + esc(a[3]) + '</span><br>' +
+                          '<span style="white-space: nowrap;">' + esc(a[5]) + '</span>' +
+                          '</div>'
+                });
+            }
+
+            {% if this.renderer == 'canvas' %}
+            // Rows and track points as last sent, drawn by the canvas layer
+            var aircraft = {}, trackData = {}, showLabels = {{ this.show_labels|tojson }};
+            var trackDash = trackStyle.dashArray ? trackStyle.dashArray.split(',').map(Number) : [];
+            var AdsbCanvasLayer = L.Layer.extend({
+                onAdd: function(map) {
+                    this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+                    this._canvas.style.pointerEvents = 'none';
+                    map.getPanes().overlayPane.appendChild(this._canvas);
+                    map.on('moveend resize', this._reset, this);
+                    this._reset();
+                },
+                onRemove: function(map) {
+                    L.DomUtil.remove(this._canvas);
+                    map.off('moveend resize', this._reset, this);
+                },
+                // Coalesces redraws to at most one per animation frame
+                redraw: function() {
+                    if (this._canvas && !this._frame) {
+                        this._frame = L.Util.requestAnimFrame(this._draw, this);
+                    }
+                },
+                _reset: function() {
+                    var size = map.getSize(), ratio = window.devicePixelRatio || 1;
+                    L.DomUtil.setPosition(this._canvas, map.containerPointToLayerPoint([0, 0]));
+                    this._canvas.width = size.x * ratio;
+                    this._canvas.height = size.y * ratio;
+                    this._canvas.style.width = size.x + 'px';
+                    this._canvas.style.height = size.y + 'px';
+                    this._draw();
+                },
+                _draw: function() {
+                    this._frame = null;
+                    var ctx = this._canvas.getContext('2d'), ratio = window.devicePixelRatio || 1;
+                    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+                    ctx.clearRect(0, 0, this._canvas.width, this._canvas.height);
+
+                    // 1. All trails as one path
+                    ctx.strokeStyle = trackStyle.color;
+                    ctx.lineWidth = trackStyle.weight;
+                    ctx.globalAlpha = trackStyle.opacity === undefined ? 1 : trackStyle.opacity;
+                    ctx.setLineDash(trackDash);
+                    ctx.beginPath();
+                    Object.keys(trackData).forEach(function(h) {
+                        var pts = trackData[h];
+                        for (var i = 0; i < pts.length; i++) {
+                            var pt = map.latLngToContainerPoint(pts[i]);
+                            if (i) { ctx.lineTo(pt.x, pt.y); } else { ctx.moveTo(pt.x, pt.y); }
+                        }
+                    });
+                    ctx.stroke();
+
+                    // 2. All aircraft circles as one path
+                    var points = {};
+                    ctx.globalAlpha = 1;
+                    ctx.setLineDash([]);
+                    ctx.strokeStyle = '#00FF00';
+                    ctx.lineWidth = 1.5;
+                    ctx.beginPath();
+                    Object.keys(aircraft).forEach(function(h) {
+                        var pt = points[h] = map.latLngToContainerPoint([aircraft[h][1], aircraft[h][2]]);
+                        ctx.moveTo(pt.x + 3, pt.y);
+                        ctx.arc(pt.x, pt.y, 3, 0, 2 * Math.PI);
+                    });
+                    ctx.stroke();
+
+                    // 3. Labels that survived decluttering, laid out like the SVG ones
+                    if (!showLabels) { return; }
+                    ctx.fillStyle = '#00FF00';
+                    ctx.font = '500 9pt "Helvetica Neue", Arial, Helvetica, sans-serif';
+                    ctx.textBaseline = 'top';
+                    Object.keys(aircraft).forEach(function(h) {
+                        var a = aircraft[h], pt = points[h];
+                        if (a[6]) {
+                            ctx.fillText(a[3], pt.x + 10, pt.y - 7);
+                            ctx.fillText(a[5], pt.x + 10, pt.y + 7.4);
+                        }
+                    });
+                }
+            });
+            var canvasLayer = new AdsbCanvasLayer().addTo(map);
+
+            // The canvas takes no events, so a map click opens the popup of the nearest aircraft
+            map.on('click', function(e) {
+                var best = null, bestDist = 8 * 8;
+                Object.keys(aircraft).forEach(function(h) {
+                    var pt = map.latLngToContainerPoint([aircraft[h][1], aircraft[h][2]]);
+                    var dx = pt.x - e.containerPoint.x, dy = pt.y - e.containerPoint.y;
+                    if (dx * dx + dy * dy < bestDist) {
+                        best = aircraft[h];
+                        bestDist = dx * dx + dy * dy;
+                    }
+                });
+                if (best) {
+                    L.popup().setLatLng([best[1], best[2]]).setContent(popupHtml(best)).openOn(map);
+                }
+            });
+            {% endif %}
+
+            function clusterIcon(n) {
+                var size = n < 10 ? 24 : (n < 100 ? 30 : 36);
+                return L.divIcon({
+                    className: 'empty',
+                    iconSize: [size, size],
+                    iconAnchor: [size / 2, size / 2],
+                    html: '<div style="width: ' + size + 'px; height: ' + size + 'px; box-sizing: border-box; border-radius: 50%; border: 1.5px solid #00FF00; background-color: rgba(0, 0, 0, 0.7); color: #00FF00; font-size: 9pt; display: flex; align-items: center; justify-content: center;">' +
+                          n + '</div>'
+                });
+            }
+            function airportMarkers(a) {
+                var ll = [a[1], a[2]];
+                return [
+                    new L.RegularPolygonMarker(ll, {
+                        numberOfSides: 4, radius: 6, rotation: 45, color: a[3], weight: 2,
+                        fill: true, fillColor: a[3], fillOpacity: 1.0
+                    }).bindPopup(esc(a[0])),
+                    L.marker(ll, {icon: L.divIcon({
+                        className: 'empty',
+                        iconSize: [150, 36],
+                        iconAnchor: [0, 0],
+                        html: '<div style="font-size: 9pt; font-weight: 500; color: ' + a[3] + '; margin-left: 10px; margin-top: -7px; white-space: nowrap;">' +
+                              esc(a[0]) + '</div>'
+                    })})
+                ];
+            }
+
+            window.adsbUpdate = function(p) {
+                document.getElementById('adsb-count').textContent = 'Aircraft: ' + p.count;
+                {% if this.renderer == 'canvas' %}
+                p.remove.forEach(function(h) { delete aircraft[h]; });
+                p.aircraft.forEach(function(a) { aircraft[a[0]] = a; });
+                p.drop_tracks.forEach(function(h) { delete trackData[h]; });
+                Object.keys(p.tracks).forEach(function(h) { trackData[h] = p.tracks[h]; });
+                canvasLayer.redraw();
+                {% else %}
+                p.remove.forEach(function(h) {
+                    if (markers[h]) {
+                        markerLayer.removeLayer(markers[h]);
+                        delete markers[h];
+                    }
+                    if (labels[h]) {
+                        labelLayer.removeLayer(labels[h]);
+                        delete labels[h];
+                    }
+                });
+                p.aircraft.forEach(function(a) {
+                    var h = a[0], ll = [a[1], a[2]];
+                    var label = a[3] + '|' + a[5];
+                    if (!markers[h]) {
+                        markers[h] = L.circleMarker(ll, {
+                            radius: 3, color: '#00FF00', weight: 1.5, fill: false,
+                            fillColor: '#000000', fillOpacity: 1.0
+                        }).bindPopup(popupHtml(a)).addTo(markerLayer);
+                    } else {
+                        markers[h].setLatLng(ll).setPopupContent(popupHtml(a));
+                    }
+                    // Labels hidden by the declutter pass are not kept on the page
+                    if (!a[6]) {
+                        if (labels[h]) {
+                            labelLayer.removeLayer(labels[h]);
+                            delete labels[h];
+                        }
+                        return;
+                    }
+                    if (!labels[h]) {
+                        labels[h] = L.marker(ll, {icon: labelIcon(a), interactive: false}).addTo(labelLayer);
+                        labels[h].adsbLabel = label;
+                        return;
+                    }
+                    labels[h].setLatLng(ll);
+                    if (labels[h].adsbLabel !== label) {
+                        labels[h].setIcon(labelIcon(a));
+                        labels[h].adsbLabel = label;
+                    }
+                });
+                p.drop_tracks.forEach(function(h) {
+                    if (tracks[h]) {
+                        trackLayer.removeLayer(tracks[h]);
+                        delete tracks[h];
+                    }
+                });
+                Object.keys(p.tracks).forEach(function(h) {
+                    if (tracks[h]) {
+                        tracks[h].setLatLngs(p.tracks[h]);
+                    } else {
+                        tracks[h] = L.polyline(p.tracks[h], trackStyle).addTo(trackLayer);
+                    }
+                });
+                {% endif %}
+                p.drop_clusters.forEach(function(c) {
+                    if (clusters[c]) {
+                        clusterLayer.removeLayer(clusters[c]);
+                        delete clusters[c];
+                    }
+                });
+                p.clusters.forEach(function(c) {
+                    var ll = [c[1], c[2]];
+                    if (!clusters[c[0]]) {
+                        clusters[c[0]] = L.marker(ll, {icon: clusterIcon(c[3])}).on('click', function(e) {
+                            map.setView(e.target.getLatLng(), Math.min(map.getZoom() + 2, 18));
+                        }).addTo(clusterLayer);
+                        clusters[c[0]].adsbCount = c[3];
+                        return;
+                    }
+                    clusters[c[0]].setLatLng(ll);
+                    if (clusters[c[0]].adsbCount !== c[3]) {
+                        clusters[c[0]].setIcon(clusterIcon(c[3]));
+                        clusters[c[0]].adsbCount = c[3];
+                    }
+                });
+                p.drop_airports.forEach(function(c) {
+                    if (airports[c]) {
+                        airports[c].forEach(function(l) { airportLayer.removeLayer(l); });
+                        delete airports[c];
+                    }
+                });
+                p.airports.forEach(function(a) {
+                    if (!airports[a[0]]) {
+                        airports[a[0]] = airportMarkers(a);
+                        airports[a[0]].forEach(function(l) { l.addTo(airportLayer); });
+                    }
+                });
+            };
+
+            // The view settled on after each pan or zoom, polled from Python via adsbView()
+            var view = null;
+            function updateView() {
+                var b = map.getBounds();
+                view = [b.getSouth(), b.getWest(), b.getNorth(), b.getEast()]
+                    .map(function(v) { return +v.toFixed(4); }).concat([map.getZoom()]);
+            }
+            map.on('moveend', updateView);
+            updateView();
+
+            window.adsbView = function() {
+                return view;
+            };
+
+            window.adsbSetPerf = function(text) {
+                document.getElementById('adsb-perf').textContent = text;
+            };
+
+            window.adsbSetLabels = function(show) {
+                {% if this.renderer == 'canvas' %}
+                showLabels = show;
+                canvasLayer.redraw();
+                {% else %}
+                if (show) { labelLayer.addTo(map); } else { map.removeLayer(labelLayer); }
+                {% endif %}
+            };
+
+            window.adsbSetZoom = function(zoom) {
+                map.setZoom(zoom);
+            };
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, track_style, show_labels=True, renderer='svg'):
+        super().__init__()
+        self._name = 'AdsbMapBridge'
+        self.track_style = track_style
+        self.show_labels = show_labels
+        self.renderer = renderer
+
+
+class AircraftFetcher(QObject):
+    """
+    Polls aircraft.json on a background thread.
+
+    Owns the feed poller (HTTP or streaming, or a MultiFeedPoller for
+    several URLs) so a slow or unreachable receiver never blocks the GUI;
+    parsed snapshots are delivered through snapshot_ready. Unchanged
+    snapshots are dropped by the poller.
+    New snapshots are also handed to the recorder, if there is one.
+    """
+    snapshot_ready = pyqtSignal(object)
+    fetch_failed = pyqtSignal(str)
+    stage_timed = pyqtSignal(str, float)  # (stage, ms) for the StageTimer
+
+    def __init__(self, urls, interval_ms, recorder=None):
+        super().__init__()
+        self.urls = urls
+        self.interval_ms = interval_ms
+        self.recorder = recorder
+        self.timer = None
+        self.poller = None
+
+    @pyqtSlot()
+    def start(self):
+        """Starts polling. Runs in the worker thread."""
+        # Keep-alive sessions, created in this thread
+        if len(self.urls) == 1:
+            self.poller = make_feed_poller(self.urls[0], receiver=(RECEIVER_LAT, RECEIVER_LON))
+        else:
+            self.poller = MultiFeedPoller(self.urls, FEED_TIMEOUT_S, report_seconds=FEED_REPORT_S,
+                                          receiver=(RECEIVER_LAT, RECEIVER_LON))
+        
+        # The timer is created here so it lives in the worker thread
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(self.interval_ms)
+        
+        # Run the first poll immediately
+        self.poll()
+
+    @pyqtSlot()
+    def stop(self):
+        """Stops polling. Runs in the worker thread."""
+        if self.timer is not None:
+            self.timer.stop()
+        if self.poller is not None:
+            self.poller.close()
+
+    @pyqtSlot()
+    def poll(self):
+        """Fetches one aircraft.json snapshot and emits it."""
+        try:
+            result = self.poller.poll()
+        except (requests.exceptions.RequestException, OSError) as e:
+            self.fetch_failed.emit(f"Error fetching data: {e}")
+            return
+        except ValueError as e:
+            self.fetch_failed.emit(f"Error decoding data: {e}")
+            return
+        if result is None:
+            return # Unchanged since the last poll
+        data, content, http_ms, parse_ms = result
+        
+        if self.recorder is not None:
+            self.recorder.write(content) # Raw bytes; compressed on the writer thread
+        
+        self.stage_timed.emit('http', http_ms)
+        self.stage_timed.emit('parse', parse_ms)
+        self.snapshot_ready.emit(data)
+
+
+class ReplayFetcher(QObject):
+    """
+    Stands in for AircraftFetcher and replays a recording instead.
+
+    Snapshots are paced by their recorded times divided by the speed
+    (0 = as fast as possible). The next snapshot is only sent once the
+    GUI reports the previous one processed (frame_done), so every frame
+    goes through the full update path and the achieved frame rate is a
+    real measure of processing throughput.
+    """
+    snapshot_ready = pyqtSignal(object)
+    fetch_failed = pyqtSignal(str)
+    stage_timed = pyqtSignal(str, float)  # (stage, ms) for the StageTimer
+
+    def __init__(self, path, speed):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.timer = None
+        self.frames = None
+        self.pending = None
+        self.first_time = None
+        self.start_wall = None
+        self.frame_count = 0
+        self.report_wall = None
+        self.report_count = 0
+
+    @pyqtSlot()
+    def start(self):
+        """Starts the replay. Runs in the worker thread."""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.send_pending)
+        
+        self.frames = read_recording(self.path)
+        if self.read_next():
+            self.first_time = self.pending[0]
+            self.start_wall = self.report_wall = time.monotonic()
+            self.send_pending()
+
+    @pyqtSlot()
+    def stop(self):
+        """Stops the replay. Runs in the worker thread."""
+        if self.timer is not None:
+            self.timer.stop()
+
+    def read_next(self):
+        """Reads the next recorded snapshot into self.pending."""
+        try:
+            self.pending = next(self.frames)
+            return True
+        except StopIteration:
+            elapsed = time.monotonic() - self.start_wall if self.start_wall else 0
+            print(f"Replay finished: {self.frame_count} frames in {elapsed:.1f} s "
+                  f"({self.frame_count / max(elapsed, 1e-9):.1f} fps)")
+        except (OSError, ValueError) as e:
+            self.fetch_failed.emit(f"Error reading recording: {e}")
+        self.pending = None
+        return False
+
+    @pyqtSlot()
+    def send_pending(self):
+        """Decodes the pending snapshot and emits it."""
+        try:
+            start = time.perf_counter()
+            data = json.loads(self.pending[1])
+        except ValueError as e:
+            self.fetch_failed.emit(f"Error decoding data: {e}")
+            self.frame_done() # Skip it and move on
+            return
+        self.stage_timed.emit('parse', (time.perf_counter() - start) * 1000)
+        self.snapshot_ready.emit(data)
+
+    @pyqtSlot()
+    def frame_done(self):
+        """The GUI finished a frame: report progress and schedule the next one."""
+        self.frame_count += 1
+        now = time.monotonic()
+        if now - self.report_wall >= 5:
+            fps = (self.frame_count - self.report_count) / (now - self.report_wall)
+            print(f"Replay: {self.frame_count} frames, {fps:.1f} fps")
+            self.report_wall = now
+            self.report_count = self.frame_count
+        
+        if not self.read_next():
+            return
+        delay = 0
+        if self.speed > 0:
+            due = self.start_wall + (self.pending[0] - self.first_time) / self.speed
+            delay = max(0, due - now)
+        self.timer.start(int(delay * 1000))
+
+
 class AdsbTracker(QMainWindow):
     """Main application window."""
     
-    def __init__(self):
+    # Emitted after each snapshot has been processed and drawn
+    frame_processed = pyqtSignal()
+
+    def __init__(self, fetch=True):
         super().__init__()
         
         # --- Data Storage ---
@@ -143,34 +759,64 @@ class AdsbTracker(QMainWindow):
         # self.all_altitudes = [] # REMOVED
         # self.all_groundspeeds = [] # REMOVED
         
-        # To track unique aircraft for smoother map updates
-        self.current_aircraft = {}  
+        # Ingest and tracks live in the display-agnostic core
+        self.core = AdsbCore(
+            MAX_TRACK_POINTS,
+            keep_all_tracks=KEEP_ALL_TRACKS,
+            track_max_age=TRACK_MAX_AGE_S,
+            track_max_count=TRACK_MAX_COUNT,
+            track_memory_budget_mb=TRACK_MEMORY_BUDGET_MB,
+        )
+        # Latest normalized snapshot, shared by the map, plots and tracks
+        self.snapshot = self.core.snapshot
         # To store position history for track lines
-        self.aircraft_tracks = {}
+        self.aircraft_tracks = self.core.tracks
+        # Latest snapshot from the fetch worker, waiting to be processed
+        self.pending_data = None
+        # Rolling per-stage timings, and when the overlay was last refreshed
+        self.stage_timer = StageTimer(PERF_STAGES, PERF_WINDOW, PERF_CSV)
+        self.perf_overlay_time = 0
         
         # --- State for UI toggles ---
         self.show_labels = True
         # --- ADDED: State for persistent zoom ---
         self.current_zoom = MAP_START_ZOOM
+        # (zoom, deadline) of a +/- zoom the map has not reported reaching yet
+        self.pending_zoom = None
+        # --- State for the persistent map page ---
+        # The native scope is used unless the Leaflet page is asked for (and can be shown)
+        self.native_map = MAP_VIEW != 'web' or QWebEngineView is None
+        if MAP_VIEW == 'web' and QWebEngineView is None:
+            print("Warning: QtWebEngine is not installed, using the native map view.")
+        self.map_ready = False
+        # What the page currently shows, so each update only sends changes
+        self.map_state = {}
+        self.map_tracks = {}
+        self.map_airports = set()
+        self.map_clusters = {}
+        self.map_labels = set()
+        # Visible bounds last reported by the page (south, west, north, east)
+        self.map_bounds = None
+        # Spatial indexes used to cull what is sent to the page to the view
+        self.aircraft_grid = SpatialGrid(CULL_GRID_DEG)
+        self.track_grid = SpatialGrid(CULL_GRID_DEG)
+        self.track_grid_keys = {}
+        self.airport_grid = SpatialGrid(CULL_GRID_DEG)
+        # Rendered page (static base layer + bridge) and the config it was built from
+        self.map_html = None
+        self.base_layer_key = None
 
         # --- MODIFICATION: Load VA, MD, and DC data from the user-provided repo ---
         self.state_data = None
         try:
-            # Base URL for the raw files
-            base_url = "https://raw.githubusercontent.com/glynnbird/usstatesgeojson/master/"
-            
             # List of files to fetch
             state_files = ["virginia.geojson", "maryland.geojson"]
             
             combined_features = []
             
             for state_file in state_files:
-                url = base_url + state_file
-                response = requests.get(url)
-                response.raise_for_status() # Check for download errors
-                
-                # Each file is a single GeoJSON "Feature" object
-                state_feature = response.json() 
+                # Simplified outline from the local cache (downloaded on first run)
+                state_feature = load_state_feature(state_file, STATE_CACHE_DIR, STATE_SIMPLIFY_TOLERANCE)
                 
                 # Add the feature to our list
                 combined_features.append(state_feature)
@@ -189,15 +835,56 @@ class AdsbTracker(QMainWindow):
         # --- END MODIFICATION ---
 
         self.initUI()
+        # Load the map page once; aircraft are pushed into it on each update
+        self.load_map()
         
-        # --- Setup Timer ---
-        # This timer will trigger the data update
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_data)
-        self.timer.start(UPDATE_INTERVAL_MS)
+        # --- Setup Fetch Worker ---
+        # aircraft.json is polled on its own thread so network latency
+        # never blocks the GUI; snapshots arrive via signals.
+        # fetch=False leaves the window idle (e.g. for benchmarks that feed
+        # process_aircraft_data() directly)
+        self.recorder = None
+        self.fetcher = None
+        if fetch:
+            self.start_fetcher()
+
+    def start_fetcher(self):
+        """Starts the recorder (if configured) and the fetch worker thread."""
+        if RECORD_DIR and not REPLAY_PATH:
+            self.recorder = SnapshotRecorder(
+                RECORD_DIR,
+                rotate_bytes=RECORD_ROTATE_MB * 1024 * 1024,
+                rotate_seconds=RECORD_ROTATE_MINUTES * 60,
+            )
+            print(f"Recording snapshots to {RECORD_DIR}")
         
-        # Run the first update immediately
-        self.update_data()
+        self.fetch_thread = QThread(self)
+        if REPLAY_PATH:
+            # Replay a recording instead; it waits for each frame to be processed
+            self.fetcher = ReplayFetcher(REPLAY_PATH, REPLAY_SPEED)
+            self.frame_processed.connect(self.fetcher.frame_done)
+            print(f"Replaying {REPLAY_PATH} at speed {REPLAY_SPEED or 'max'}")
+        else:
+            self.fetcher = AircraftFetcher([DATA_URL] + EXTRA_DATA_URLS, UPDATE_INTERVAL_MS, self.recorder)
+        self.fetcher.moveToThread(self.fetch_thread)
+        self.fetch_thread.started.connect(self.fetcher.start)
+        self.fetcher.snapshot_ready.connect(self.on_snapshot)
+        self.fetcher.fetch_failed.connect(self.on_fetch_failed)
+        self.fetcher.stage_timed.connect(self.on_stage_timed)
+        self.fetch_thread.start()
+
+    def closeEvent(self, event):
+        """Stops the fetch worker (and recorder) before the window closes."""
+        if self.fetcher is not None:
+            QMetaObject.invokeMethod(self.fetcher, "stop", Qt.BlockingQueuedConnection)
+            self.fetch_thread.quit()
+            self.fetch_thread.wait()
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"Recorded {self.recorder.written} snapshots "
+                  f"({self.recorder.dropped} dropped, {self.recorder.errors} failed)")
+        self.stage_timer.close()
+        super().closeEvent(event)
 
     def initUI(self):
         """Initializes the main window layout."""
@@ -219,11 +906,22 @@ class AdsbTracker(QMainWindow):
         left_layout.setSpacing(0) # No space between map and control bar
 
         # --- 1. Map View (Top) ---
-        self.map_view = QWebEngineView()
-        # Set the view's background to black to make the "flash" on reload black
-        self.map_view.setStyleSheet("background-color: black;")
-        # Set the underlying web page's default background to black
-        self.map_view.page().setBackgroundColor(Qt.black)
+        if self.native_map:
+            self.map_view = RadarScope((RECEIVER_LAT, RECEIVER_LON), self.current_zoom,
+                                       self.map_track_style(), show_labels=self.show_labels)
+            self.map_view.view_changed.connect(self.on_map_view)
+        else:
+            self.map_view = QWebEngineView()
+            # Set the view's background to black to make the "flash" on reload black
+            self.map_view.setStyleSheet("background-color: black;")
+            # Set the underlying web page's default background to black
+            self.map_view.page().setBackgroundColor(Qt.black)
+            self.map_view.loadFinished.connect(self.on_map_loaded)
+            self.map_view.page().renderProcessTerminated.connect(self.on_render_process_terminated)
+            # The page is polled for its view after pans and zooms
+            self.map_view_timer = QTimer(self)
+            self.map_view_timer.timeout.connect(self.poll_map_view)
+            self.map_view_timer.start(MAP_VIEW_POLL_MS)
         # self.map_view.setMinimumWidth(800) # REMOVED - let it fill
         
         # --- MODIFICATION: Add map with stretch factor 1 ---
@@ -307,189 +1005,116 @@ class AdsbTracker(QMainWindow):
             self.label_toggle_button.setStyleSheet(
                 "font-size: 12pt; color: #808080; background-color: black; text-align: left; padding: 5px;"
             )
-        # The main update_data timer will automatically pick up this
-        # state change on its next cycle.
+        # Show/hide the label layer on the page right away
+        if self.native_map:
+            self.map_view.set_labels(self.show_labels)
+        else:
+            self.run_map_js(f"adsbSetLabels({json.dumps(self.show_labels)});")
 
     # --- ADDED: Methods to control zoom ---
     def zoom_in(self):
         """Increases the map zoom level, persisting on reload."""
         # Cap max zoom at 18
         self.current_zoom = min(18, self.current_zoom + 0.5)
+        self.pending_zoom = (self.current_zoom, time.monotonic() + MAP_ZOOM_SETTLE_S)
+        self.set_map_zoom()
         print(f"Zoom set to: {self.current_zoom}")
 
     def zoom_out(self):
         """Decreases the map zoom level, persisting on reload."""
         # Cap min zoom at 4
         self.current_zoom = max(4, self.current_zoom - 0.5)
+        self.pending_zoom = (self.current_zoom, time.monotonic() + MAP_ZOOM_SETTLE_S)
+        self.set_map_zoom()
         print(f"Zoom set to: {self.current_zoom}")
     # --- END ADDITION ---
 
-    def fetch_aircraft_data(self):
-        """Fetches and processes aircraft data from the receiver."""
+    def set_map_zoom(self):
+        """Sends current_zoom to the map; it reports the new view back."""
+        if self.native_map:
+            self.map_view.set_zoom(self.current_zoom)
+        else:
+            self.run_map_js(f"adsbSetZoom({self.current_zoom});")
+
+    def process_aircraft_data(self, data):
+        """Processes an aircraft.json snapshot delivered by the fetch worker."""
         try:
-            # Set a short timeout to avoid blocking the GUI
-            response = requests.get(DATA_URL, timeout=2.0)
-            response.raise_for_status() # Raise an error for bad responses
-            data = response.json()
-            
-            # new_distances = [] # REMOVED
-            # new_altitudes = [] # REMOVED
-            # new_groundspeeds = [] # REMOVED
-            # receiver_pos = (RECEIVER_LAT, RECEIVER_LON) # REMOVED
-            
-            # Use a temp dict to update aircraft positions
-            temp_aircraft_seen = {}
-            current_hex_codes = set()
-
-            for ac in data.get('aircraft', []):
-                # We need lat, lon, and altitude to plot
-                lat = ac.get('lat')
-                lon = ac.get('lon')
-                
-                # Use barometric altitude, fall back to geometric
-                alt = ac.get('alt_baro', ac.get('alt_geom'))
-                
-                # Skip aircraft with no position or altitude
-                if lat is None or lon is None or alt is None:
-                    continue
-                        
-                # Handle 'ground' value for altitude
-                if alt == 'ground':
-                    alt = 0
-                
-                # Ensure alt is in a number
-                try:
-                    alt_ft = float(alt)
-                except ValueError:
-                    continue
-                        
-                # Calculate distance
-                # ac_pos = (lat, lon) # REMOVED
-                # dist_miles = haversine(receiver_pos, ac_pos, unit=Unit.MILES) # REMOVED
-                
-                # --- MODIFICATION: Get groundspeed (still needed for map labels) ---
-                # gs_val = ac.get('gs') # This logic is handled in update_map
-                # ...
-                
-                # Add to our lists for this update cycle
-                # new_distances.append(dist_miles) # REMOVED
-                # new_altitudes.append(alt_ft) # REMOVED
-                # new_groundspeeds.append(gs_float) # REMOVED
-                
-                # Store for map
-                hex_code = ac.get('hex', str(time.time())) # Use time as fallback key
-                current_hex_codes.add(hex_code)
-                temp_aircraft_seen[hex_code] = {
-                    'lat': lat,
-                    'lon': lon,
-                    'alt': alt_ft,
-                    'flight': ac.get('flight', 'N/A').strip(),
-                    # --- CHANGE 2: Store groundspeed ---
-                    'gs': ac.get('gs', 'N/A')
-                }
-                
-                # --- Track Line Logic ---
-                # Get existing track, or a new empty list
-                track = self.aircraft_tracks.get(hex_code, [])
-                
-                # Append new position
-                track.append([lat, lon])
-                
-                # Limit track length
-                if len(track) > MAX_TRACK_POINTS:
-                    track = track[-MAX_TRACK_POINTS:]
-                        
-                # Store the updated track
-                self.aircraft_tracks[hex_code] = track
-
-            # Update cumulative lists
-            # self.all_distances.extend(new_distances) # REMOVED
-            # self.all_altitudes.extend(new_altitudes) # REMOVED
-            # self.all_groundspeeds.extend(new_groundspeeds) # REMOVED
-            
-            # Update the main aircraft dictionary
-            self.current_aircraft = temp_aircraft_seen
-            
-            # Conditionally prune old tracks
-            if KEEP_ALL_TRACKS == 0:
-                # --- Prune old aircraft tracks ---
-                # Remove tracks for aircraft that are no longer in the feed
-                all_tracked_hex = list(self.aircraft_tracks.keys())
-                for hex_code in all_tracked_hex:
-                    if hex_code not in current_hex_codes:
-                        del self.aircraft_tracks[hex_code]
-            
+            self.snapshot = self.core.process(data)
             return True # Success
             
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data: {e}")
         except Exception as e:
             print(f"Error processing data: {e}")
             
         return False # Failure
 
+    def on_snapshot(self, data):
+        """Receives a snapshot from the fetch worker."""
+        # Keep only the newest snapshot; if the GUI falls behind, stale
+        # snapshots are dropped instead of queuing up
+        if self.pending_data is None:
+            QTimer.singleShot(0, self.update_data)
+        self.pending_data = data
+
+    def on_stage_timed(self, stage, ms):
+        """Records a stage timed by the fetch worker (HTTP, parse)."""
+        self.stage_timer.add(stage, ms)
+
+    def on_fetch_failed(self, message):
+        """Reports a failed poll from the fetch worker."""
+        print(message)
+        # Optional: handle failed update (e.g., show "Disconnected")
+        print("Data update failed, skipping GUI refresh.")
+
     def update_data(self):
-        """Timer-driven function to update all UI elements."""
-        if self.fetch_aircraft_data():
-            # If data fetch was successful, update all GUI elements
-            self.update_map()
-            # --- MODIFICATION: Call all four plot updaters ---
-            # self.update_scatter_dist_plot() # REMOVED
-            # self.update_hist_alt_plot() # REMOVED
-            # self.update_scatter_gs_plot() # REMOVED
-            # self.update_hist_gs_plot() # REMOVED
+        """Processes the latest snapshot and updates all UI elements."""
+        data = self.pending_data
+        self.pending_data = None
+        if data is None:
+            return
+        
+        timer = self.stage_timer
+        with timer.time('total'):
+            with timer.time('process'):
+                ok = self.process_aircraft_data(data)
+            if ok:
+                # If data fetch was successful, update all GUI elements
+                with timer.time('update_map'):
+                    self.update_map()
+                # --- MODIFICATION: Call all four plot updaters ---
+                # self.update_scatter_dist_plot() # REMOVED
+                # self.update_hist_alt_plot() # REMOVED
+                # self.update_scatter_gs_plot() # REMOVED
+                # self.update_hist_gs_plot() # REMOVED
+            else:
+                print("Data update failed, skipping GUI refresh.")
+        timer.end_frame()
+        self.update_perf_overlay()
+        self.frame_processed.emit()
+
+    def update_perf_overlay(self):
+        """Shows the rolling stage timings on the map, at most once a second."""
+        now = time.time()
+        if PERF_OVERLAY != 1 or now - self.perf_overlay_time < 1:
+            return
+        self.perf_overlay_time = now
+        if self.native_map:
+            self.map_view.set_perf(self.stage_timer.summary())
         else:
-            # Optional: handle failed update (e.g., show "Disconnected")
-            print("Data update failed, skipping GUI refresh.")
+            self.run_map_js(f"adsbSetPerf({json.dumps(self.stage_timer.summary())});")
 
-    def update_map(self):
-        """Refreshes the folium map with current aircraft positions."""
-        
-        # 1. Create a new map instance
-        # --- MODIFIED: Use self.current_zoom instead of MAP_START_ZOOM ---
-        m = folium.Map(location=[RECEIVER_LAT, RECEIVER_LON], 
-                       zoom_start=self.current_zoom,
-                       tiles=None, # Removed map tiles
-                       zoom_control=False) # Disable zoom buttons
-        
-                       
-        # --- UPDATED MODIFICATION: Inject CSS to force black background and hide Leaflet logo ---
-        # This styles the HTML body AND the Leaflet map container
-        black_bg_style = """
-        <style>
-            body { 
-                background-color: black !important; 
-            }
-            .leaflet-container { 
-                background-color: black !important; 
-            }
-            .leaflet-control-attribution {
-                display: none !important;
-            }
-        </style>
-        """
-        m.get_root().header.add_child(folium.Element(black_bg_style))
-        # --- END UPDATED MODIFICATION ---
+    def base_layer_config(self):
+        """Returns everything the rendered page depends on (static base layer and renderer)."""
+        return (
+            RECEIVER_LAT, RECEIVER_LON,
+            PLOT_DC_AIRSPACE, DCA_VOR_LAT, DCA_VOR_LON,
+            PLOT_AIRPORTS, tuple(AIRPORT_LOCATIONS.items()),
+            id(self.state_data),
+            MAP_RENDERER,
+        )
 
-        # --- CHANGE 3: Add Aircraft Count ---
-        ac_count = len(self.current_aircraft)
-        count_html = f"""
-        <div style="position: fixed; 
-                    bottom: 10px; 
-                    left: 10px; 
-                    z-index: 1000; 
-                    font-family: Arial, sans-serif; 
-                    font-size: 12pt; 
-                    
-                    color: green; 
-                    background-color: rgba(0, 0, 0, 1);
-                    padding: 5px 10px;
-                    border-radius: 5px;">
-            Aircraft: {ac_count}
-        </div>
-        """
-        m.get_root().html.add_child(folium.Element(count_html))
-        # --- END CHANGE 3 ---
+    def build_base_layer(self):
+        """Builds the static decoration that never changes between updates."""
+        base = folium.FeatureGroup(name='Base Layer', control=False)
         
         # --- Add US State Outlines for VA, MD, and DC ---
         
@@ -513,7 +1138,7 @@ class AdsbTracker(QMainWindow):
                 highlight_function=lambda x: {'fillColor': '#00FF00', 'color': '#00FF00', 'weight': 3, 'fillOpacity': 0.1},
                 # Use the pre-combined data
                 data=self.state_data,
-            ).add_to(m)
+            ).add_to(base)
         # --- END MODIFICATION ---
             
         # 2. Add a marker for the receiver (Triangle)
@@ -528,21 +1153,10 @@ class AdsbTracker(QMainWindow):
             fill_color="#000000", # Black fill
             fill_opacity=1.0,
             weight=1
-        ).add_to(m)
+        ).add_to(base)
         
         # --- CHANGE 4: Add labeled distance rings ---
-        DEG_LAT_PER_METER = 1 / 111111 # Approx
-        
-        # Radii from original code
-        rings_to_plot = [
-            (80467/5, " 10 mi"),    # 10 miles
-            (2*80467/5, "20 mi"), # 20 miles
-            (3*80467/5, "30 mi"), # 30 miles
-            (4*80467/5, "40 mi"), # 40 miles
-            (80467, "50 mi")     # 50 miles
-        ]
-        
-        for radius_m, label_txt in rings_to_plot:
+        for radius_m, label_txt in RANGE_RINGS:
             # Make rings white
             folium.Circle(
                 location=[RECEIVER_LAT, RECEIVER_LON],
@@ -551,7 +1165,7 @@ class AdsbTracker(QMainWindow):
                 fill=False,
                 opacity = 0.75,
                 weight=1
-            ).add_to(m)
+            ).add_to(base)
             
             # Add label at 6 o' clock
             # Calculate 6 o'clock position (approx)
@@ -576,7 +1190,7 @@ class AdsbTracker(QMainWindow):
                     f'</div>'
                     )
                 )
-            ).add_to(m)
+            ).add_to(base)
                             
             
         
@@ -596,7 +1210,7 @@ class AdsbTracker(QMainWindow):
                 fill_opacity=0*0.125/2,  
                 dash_array="4, 4",
                 popup="DC SFRA (30 NM Ring)"
-            ).add_to(m)
+            ).add_to(base)
             
             # Add 15 NM FRZ Circle
             folium.Circle(
@@ -607,190 +1221,388 @@ class AdsbTracker(QMainWindow):
                 fill=True,
                 fill_opacity=0*0.125/2,
                 popup="DC FRZ (15 NM Ring)"
-            ).add_to(m)
+            ).add_to(base)
 
-        # 5. Add markers for local airports if enabled
-        if PLOT_AIRPORTS == 1:
-            # Loop over new data structure: (lat, lon, status)
-            for code, (lat, lon, status) in AIRPORT_LOCATIONS.items():
-                
-                # Set outline color based on tower status
-                if status == "towered":
-                    outline_color = "#FFFFFF" # White
-                    fill_color_set = "#FFFFFF" # White
-                else:
-                    outline_color = "#808080" # Gray
-                    fill_color_set = "#808080" # Gray    
-                    
-                folium.RegularPolygonMarker(
-                    location=[lat, lon],
-                    popup=code,
-                    number_of_sides=4,  # Square
-                    radius=6,
-                    rotation=45,    # Rotate square to look like a diamond
-                    color=outline_color, # Use the conditional color
-                    fill=True,
-                    fill_color=fill_color_set, # Black fill
-                    fill_opacity=1.0,
-                    weight=2
-                ).add_to(m)
-
-                # --- CHANGE 1: Add airport callsign text ---
-                folium.Marker(
-                    location=[lat, lon],
-                    icon=folium.DivIcon(
-                        icon_size=(150, 36),
-                        icon_anchor=(0, 0), # Anchor at top-left
-                        # Style: 9pt, 500 weight, color from variable, 10px right, 7px up, no wrapping
-                        html=f'<div style="font-size: 9pt; font-weight: 500; color: {outline_color}; margin-left: 10px; margin-top: -7px; white-space: nowrap;">{code}</div>',
-                    )
-                ).add_to(m)
-                # --- END CHANGE 1 ---
+        # 5. Local airports are drawn by the JS bridge, so they can be
+        # culled to the view along with the aircraft (see update_map)
 
-        # 6. Conditionally plot aircraft and tracks
+        return base
+
+    def map_track_style(self):
+        """Returns the track line style (Leaflet path options)."""
         if KEEP_ALL_TRACKS == 1:
-            # --- Plotting Mode 1: Persistent Tracks ---
-            
-            # 6a. Add persistent track lines for ALL stored aircraft
-            for hex_code, track in self.aircraft_tracks.items():
-                if track and len(track) >= 2:
-                    folium.PolyLine(
-                        track,
-                        color='#00FF00', # Green
-                        weight=2,
-                        dash_array="2, 4",
-                        opacity=1
-                    ).add_to(m)
-            
-            # 6b. Add markers for each CURRENTLY visible aircraft
-            for hex_code, ac in self.current_aircraft.items():
-                popup_html = (
-                    f"<b>Flight: {ac['flight']}</b><br>"
-                    f"Altitude: {ac['alt']:,} ft<br>"
-                    f"Hex: {hex_code.upper()}"
-                )
-                
-                # --- Add Aircraft Icon (Green Circle) ---
-                folium.CircleMarker(
-                    location=[ac['lat'], ac['lon']],
-                    radius=3,
-                    color='#00FF00', # Green
-                    weight=1.5,
-                    fill=False,
-                    fill_color='#000000',
-                    fill_opacity=1.0,
-                    popup=popup_html
-                ).add_to(m)
-                
-                # --- MODIFICATION: Only draw labels if toggled ON ---
-                if self.show_labels:
-                    # --- CHANGE 2: Add Callsign, Alt, and Speed Text ---
-                    # Prep for Alt/GS label
-                    try:
-                        alt_str = f"{int(ac['alt']):,}'"
-                    except (ValueError, TypeError):
-                        alt_str = "N/A"
-                    
-                    try:
-                        # Handle 'N/A' or missing gs
-                        gs_val = float(ac['gs'])
-                        gs_str = f"{int(gs_val)} kts"
-                    except (ValueError, TypeError):
-                        gs_str = "N/A"
-
-                    alt_gs_label = f"{alt_str} @ {gs_str}"
-
-                    folium.Marker(
-                        location=[ac['lat'], ac['lon']],
-                        icon=folium.DivIcon(
-                            icon_size=(150, 36),
-                            icon_anchor=(0, 0), # Anchor at top-left
-                            # Style text: 9pt, 500 weight, green, 10px right, 7px up, 2 lines
-                            html=(
-                                f'<div style="font-size: 9pt; font-weight: 500; color: #00FF00; margin-left: 10px; margin-top: -7px; line-height: 1.2;">'
-                                f'<span style="white-space: nowrap;">{ac["flight"]}</span><br>'
-                                f'<span style="white-space: nowrap;">{alt_gs_label}</span>'
-                                f'</div>'
-                            )
-                        )
-                    ).add_to(m)
-                    # --- END CHANGE 2 ---
+            return {'color': '#00FF00', 'weight': 2, 'dashArray': '2, 4', 'opacity': 1}
+        return {'color': '#00FF00', 'weight': 1, 'dashArray': '2, 4'}
+
+    def build_scope_base_layer(self):
+        """Draws the static decoration of build_base_layer() into the native scope."""
+        scope = self.map_view
+        scope.clear_base_layer()
+
+        # State outlines, thin white lines
+        if self.state_data:
+            scope.add_outlines(self.state_data, '#FFFFFF', 0.5)
+
+        # Receiver triangle
+        scope.add_receiver(RECEIVER_LAT, RECEIVER_LON, "Receiver Location")
+
+        # Labeled distance rings, labels at 6 o'clock
+        for radius_m, label_txt in RANGE_RINGS:
+            scope.add_circle(RECEIVER_LAT, RECEIVER_LON, radius_m, '#FFFFFF', opacity=0.75)
+            scope.add_text(RECEIVER_LAT - radius_m * DEG_LAT_PER_METER, RECEIVER_LON, label_txt.strip(),
+                           '#FFFFFF', opacity=0.75, background='#000000')
+
+        # DC SFRA (dashed) and FRZ
+        if PLOT_DC_AIRSPACE == 1:
+            scope.add_circle(DCA_VOR_LAT, DCA_VOR_LON, SFRA_RADIUS_METERS, 'red', dash=(4, 4),
+                             tooltip="DC SFRA (30 NM Ring)")
+            scope.add_circle(DCA_VOR_LAT, DCA_VOR_LON, FRZ_RADIUS_METERS, 'red',
+                             tooltip="DC FRZ (15 NM Ring)")
+
+        # Airports come in with the update patches, as on the page
+
+    def build_map(self):
+        """Builds the persistent folium page: static layers plus the JS bridge."""
         
-        else:
-            # --- Plotting Mode 0: Only Current Tracks ---
-            
-            # 6c. Add markers and tracks for each CURRENTLY visible aircraft
-            for hex_code, ac in self.current_aircraft.items():
-                popup_html = (
-                    f"<b>Flight: {ac['flight']}</b><br>"
-                    f"Altitude: {ac['alt']:,} ft<br>"
-                    f"Hex: {hex_code.upper()}"
-                )
-                
-                # --- Add Track Line ---
-                track = self.aircraft_tracks.get(hex_code)
-                if track and len(track) >= 2:
-                    folium.PolyLine(
-                        track,
-                        color='#00FF00', # Green
-                        dash_array="2, 4",
-                        weight=1
-                        
-                    ).add_to(m)
-                
-                # --- Add Aircraft Icon (Green Circle) ---
-                folium.CircleMarker(
-                    location=[ac['lat'], ac['lon']],
-                    radius=3,
-                    color='#00FF00', # Green
-                    weight=1.5,
-                    fill=False,
-                    fill_color='#000000',
-                    fill_opacity=1.0,
-                    popup=popup_html
-                ).add_to(m)
-                
-                # --- MODIFICATION: Only draw labels if toggled ON ---
-                if self.show_labels:
-                    # --- CHANGE 2: Add Callsign, Alt, and Speed Text ---
-                    # Prep for Alt/GS label
-                    try:
-                        alt_str = f"{int(ac['alt']):,}'"
-                    except (ValueError, TypeError):
-                        alt_str = "N/A"
+        # 1. Create the map instance
+        # --- MODIFIED: Use self.current_zoom instead of MAP_START_ZOOM ---
+        m = folium.Map(location=[RECEIVER_LAT, RECEIVER_LON], 
+                       zoom_start=self.current_zoom,
+                       tiles=None, # Removed map tiles
+                       zoom_control=False, # Disable zoom buttons
+                       zoom_snap=0.5, # Allow the half-step zoom used by the +/- buttons
+                       zoom_delta=0.5)
+        
+                       
+        # --- UPDATED MODIFICATION: Inject CSS to force black background and hide Leaflet logo ---
+        # This styles the HTML body AND the Leaflet map container
+        black_bg_style = """
+        <style>
+            body { 
+                background-color: black !important; 
+            }
+            .leaflet-container { 
+                background-color: black !important; 
+            }
+            .leaflet-control-attribution {
+                display: none !important;
+            }
+            #adsb-perf:empty {
+                display: none;
+            }
+        </style>
+        """
+        m.get_root().header.add_child(folium.Element(black_bg_style))
+        # --- END UPDATED MODIFICATION ---
+
+        # --- CHANGE 3: Add Aircraft Count ---
+        # The count is filled in by the JS bridge on every update
+        count_html = """
+        <div id="adsb-count"
+             style="position: fixed; 
+                    bottom: 10px; 
+                    left: 10px; 
+                    z-index: 1000; 
+                    font-family: Arial, sans-serif; 
+                    font-size: 12pt; 
                     
-                    try:
-                        # Handle 'N/A' or missing gs
-                        gs_val = float(ac['gs'])
-                        gs_str = f"{int(gs_val)} kts"
-                    except (ValueError, TypeError):
-                        gs_str = "N/A"
-
-                    alt_gs_label = f"{alt_str} @ {gs_str}"
-
-                    folium.Marker(
-                        location=[ac['lat'], ac['lon']],
-                        icon=folium.DivIcon(
-                            icon_size=(150, 36),
-                            icon_anchor=(0, 0), # Anchor at top-left
-                            # Style text: 9pt, 500 weight, green, 10px right, 7px up, 2 lines
-                            html=(
-                                f'<div style="font-size: 9pt; font-weight: 500; color: #00FF00; margin-left: 10px; margin-top: -7px; line-height: 1.2;">'
-                                f'<span style="white-space: nowrap;">{ac["flight"]}</span><br>'
-                                f'<span style="white-space: nowrap;">{alt_gs_label}</span>'
-                                f'</div>'
-                            )
-                        )
-                    ).add_to(m)
-                    # --- END CHANGE 2 ---
+                    color: green; 
+                    background-color: rgba(0, 0, 0, 1);
+                    padding: 5px 10px;
+                    border-radius: 5px;">
+            Aircraft: 0
+        </div>
+        """
+        m.get_root().html.add_child(folium.Element(count_html))
+
+        # Stage timings (PERF_OVERLAY), filled in by the JS bridge; hidden while empty
+        perf_html = """
+        <div id="adsb-perf"
+             style="position: fixed;
+                    bottom: 10px;
+                    left: 160px;
+                    z-index: 1000;
+                    font-family: monospace;
+                    font-size: 9pt;
+                    white-space: pre;
+                    color: green;
+                    background-color: rgba(0, 0, 0, 0.8);
+                    padding: 5px 10px;
+                    border-radius: 5px;"></div>
+        """
+        m.get_root().html.add_child(folium.Element(perf_html))
+        # --- END CHANGE 3 ---
         
+        # 2-5. Static rings, airspace, airports and state outlines
+        self.build_base_layer().add_to(m)
+
+        # 6. Add the JS bridge that draws aircraft and tracks
+        AdsbMapBridge(self.map_track_style(), show_labels=self.show_labels, renderer=MAP_RENDERER).add_to(m)
+
+        return m
+
+    def load_map(self):
+        """Loads the persistent map page into the QWebEngineView (or the native scope)."""
+        # The page is only re-rendered when the base layer config changes;
+        # otherwise the cached HTML is reused
+        with self.stage_timer.time('map_page'):
+            config = self.base_layer_config()
+            if (self.map_html is None and not self.native_map) or config != self.base_layer_key:
+                if self.native_map:
+                    self.build_scope_base_layer()
+                else:
+                    self.map_html = self.build_map().get_root().render()
+                self.base_layer_key = config
+                self.airport_grid = SpatialGrid(CULL_GRID_DEG)
+                for code, (lat, lon, status) in AIRPORT_LOCATIONS.items():
+                    self.airport_grid.set(code, [lat], [lon])
             
-        # 7. Save map to a temporary HTML buffer
-        data = io.BytesIO()
-        m.save(data, close_file=False)
-        
-        # 8. Load the HTML into the QWebEngineView
-        self.map_view.setHtml(data.getvalue().decode())
+            self.map_ready = False
+            self.map_state = {}
+            self.map_tracks = {}
+            self.map_airports = set()
+            self.map_clusters = {}
+            self.map_labels = set()
+            if self.native_map:
+                self.map_view.reset()
+            else:
+                self.map_view.setHtml(self.map_html)
+        if self.native_map:
+            # Nothing to load; the scope takes the full state right away
+            self.on_map_loaded(True)
+
+    def on_map_loaded(self, ok):
+        """Called when the map page has finished loading."""
+        if not ok:
+            print("Warning: Map page failed to load.")
+            return
+        self.map_ready = True
+        # The cached page may predate the current zoom and label state
+        self.set_map_zoom()
+        if self.native_map:
+            self.map_view.set_labels(self.show_labels)
+        else:
+            self.run_map_js(f"adsbSetLabels({json.dumps(self.show_labels)});")
+        # Push the full current state into the fresh page
+        self.update_map()
+
+    def poll_map_view(self):
+        """Asks the page for its visible bounds and zoom; the answer goes to on_map_view_polled()."""
+        if self.map_ready:
+            self.map_view.page().runJavaScript("adsbView();", self.on_map_view_polled)
+
+    def on_map_view_polled(self, view):
+        """Picks up the [south, west, north, east, zoom] the page settled on after its last pan or zoom."""
+        if isinstance(view, list) and len(view) == 5:
+            self.on_map_view(*view)
+
+    def on_map_view(self, south, west, north, east, zoom):
+        """Updates the map for a new visible area and zoom (reported by the page or the scope)."""
+        if self.pending_zoom is not None:
+            target, deadline = self.pending_zoom
+            if zoom != target and time.monotonic() < deadline:
+                return # Still animating towards a +/- zoom; keep counting from the target
+            self.pending_zoom = None
+        if (south, west, north, east) == self.map_bounds and zoom == self.current_zoom:
+            return
+        self.map_bounds = (south, west, north, east)
+        # The map can also be zoomed on the page (scroll wheel, cluster click)
+        self.current_zoom = zoom
+        # Fill in whatever has just come into view, at the new level of detail
+        if CULL_TO_VIEW == 1 or LOD_ENABLED == 1:
+            self.update_map()
+
+    def map_cull_bounds(self):
+        """Returns the visible map area grown by CULL_MARGIN, or None to send everything."""
+        if CULL_TO_VIEW != 1 or self.map_bounds is None:
+            return None
+        south, west, north, east = self.map_bounds
+        pad_lat = (north - south) * CULL_MARGIN
+        pad_lon = (east - west) * CULL_MARGIN
+        return south - pad_lat, west - pad_lon, north + pad_lat, east + pad_lon
+
+    def map_level_of_detail(self, shown):
+        """
+        Applies clustering and label decluttering to the aircraft at indices
+        shown. Returns (shown, clusters, labeled, clustered): the aircraft
+        still drawn individually, cluster rows [id, lat, lon, count], the hex
+        codes whose labels fit (None = every label), and the hex codes
+        folded into clusters (their tracks are not drawn either).
+        """
+        snap = self.snapshot
+        shown = np.asarray(shown, dtype=np.int64)
+        clustered = set()
+        if LOD_ENABLED != 1 or not len(shown):
+            return shown, [], None, clustered
+        x, y = mercator_pixels(snap.lat[shown], snap.lon[shown], self.current_zoom)
+
+        # 1. At low zoom, aircraft sharing a screen cell become one cluster marker
+        clusters = []
+        if self.current_zoom <= CLUSTER_MAX_ZOOM:
+            cells, inverse, counts = grid_clusters(x, y, CLUSTER_PX)
+            lat_sum = np.bincount(inverse, weights=snap.lat[shown], minlength=len(cells))
+            lon_sum = np.bincount(inverse, weights=snap.lon[shown], minlength=len(cells))
+            for k in np.flatnonzero(counts > 1).tolist():
+                count = int(counts[k])
+                clusters.append([f"c{cells[k]}", round(lat_sum[k] / count, 5), round(lon_sum[k] / count, 5), count])
+            single = counts[inverse] == 1
+            clustered = {snap.hex[i] for i in shown[~single].tolist()}
+            shown, x, y = shown[single], x[single], y[single]
+
+        # 2. Keep only labels that do not overlap; labels already on screen go first
+        if not self.show_labels:
+            return shown, clusters, None, clustered
+        was_labeled = np.array([snap.hex[i] in self.map_labels for i in shown.tolist()], dtype=bool)
+        order = np.argsort(~was_labeled, kind='stable')
+        keep = place_labels(x, y, LABEL_BOX_PX[0], LABEL_BOX_PX[1], order)
+        labeled = {snap.hex[i] for i in shown[keep].tolist()}
+        return shown, clusters, labeled, clustered
+
+    def on_render_process_terminated(self, status, exit_code):
+        """Reloads the cached map page if the browser process dies."""
+        print(f"Warning: Map render process terminated ({exit_code}), reloading.")
+        self.load_map()
+
+    def run_map_js(self, script):
+        """Runs a snippet of JavaScript in the map page, if it is loaded."""
+        if self.map_ready:
+            self.map_view.page().runJavaScript(script)
+
+    def update_map(self):
+        """Pushes aircraft, track and airport changes into the persistent map page."""
+        if not self.map_ready:
+            return # Page still loading; on_map_loaded() sends the full state
+
+        # Reload the page only if the static base layer config has changed
+        if self.base_layer_config() != self.base_layer_key:
+            self.load_map()
+            return
+
+        # Only what is inside the visible area (plus a margin) is sent;
+        # bounds is None until the page has reported its view
+        bounds = self.map_cull_bounds()
+
+        # 1. Aircraft markers and labels that are new or changed
+        snap = self.snapshot
+        if bounds is None:
+            shown = range(len(snap))
+        else:
+            self.aircraft_grid.set_points(snap.hex, snap.lat, snap.lon)
+            self.aircraft_grid.retain(snap.hex)
+            visible = self.aircraft_grid.query(*bounds)
+            shown = [i for i, hex_code in enumerate(snap.hex) if hex_code in visible]
+        shown, clusters, labeled, clustered = self.map_level_of_detail(shown)
+
+        aircraft = []
+        new_state = {}
+        lats, lons, alts, gss = snap.lat.tolist(), snap.lon.tolist(), snap.alt.tolist(), snap.gs.tolist()
+        for i in shown.tolist():
+            hex_code, flight, lat, lon, alt, gs = snap.hex[i], snap.flight[i], lats[i], lons[i], alts[i], gss[i]
+            # Prep for Alt/GS label (NaN groundspeed means unknown)
+            alt_str = f"{int(alt):,}'"
+            gs_str = "N/A" if gs != gs else f"{int(gs)} kts"
+
+            alt_gs_label = f"{alt_str} @ {gs_str}"
+
+            row = [hex_code, lat, lon, flight, f"{alt:,}", alt_gs_label,
+                   labeled is None or hex_code in labeled]
+            new_state[hex_code] = row
+            if self.map_state.get(hex_code) != row:
+                aircraft.append(row)
+
+        removed = [hex_code for hex_code in self.map_state if hex_code not in new_state]
+
+        # Cluster markers that are new, changed, or gone
+        new_clusters = {row[0]: row for row in clusters}
+        changed_clusters = [row for key, row in new_clusters.items() if self.map_clusters.get(key) != row]
+        dropped_clusters = [key for key in self.map_clusters if key not in new_clusters]
+
+        # 2. Track lines that are new, changed, or gone
+        if KEEP_ALL_TRACKS == 1:
+            # Persistent tracks for ALL stored aircraft
+            shown_hex = list(self.aircraft_tracks)
+        else:
+            # Only tracks for CURRENTLY visible aircraft
+            shown_hex = [hex_code for hex_code in snap.hex if hex_code in self.aircraft_tracks]
+
+        new_tracks = {}
+        for hex_code in shown_hex:
+            # The number of points ever written changes whenever the track does
+            key = self.aircraft_tracks.points_written(hex_code)
+            if key >= 2 and hex_code not in clustered:
+                new_tracks[hex_code] = key
+
+        if bounds is not None:
+            # Keep the track index current. A track that gained one point
+            # since it was filed just adds that point's cell (in one batch);
+            # new tracks, bigger jumps, and tracks whose ring buffer has
+            # turned over since the last full filing (leaving stale cells)
+            # are refiled from all their points.
+            grown = []
+            for hex_code, key in new_tracks.items():
+                indexed = self.track_grid_keys.get(hex_code)
+                if indexed is not None and indexed[0] == key:
+                    continue
+                if indexed is None or key - indexed[0] > 1 or key - indexed[1] >= MAX_TRACK_POINTS:
+                    track = self.aircraft_tracks.view(hex_code)
+                    self.track_grid.set(hex_code, track[:, TrackStore.LAT], track[:, TrackStore.LON])
+                    self.track_grid_keys[hex_code] = (key, key)
+                else:
+                    grown.append(hex_code)
+                    self.track_grid_keys[hex_code] = (key, indexed[1])
+            if grown:
+                latest = self.aircraft_tracks.latest(grown)
+                self.track_grid.add_points(grown, latest[:, TrackStore.LAT], latest[:, TrackStore.LON])
+            for hex_code in [h for h in self.track_grid_keys if h not in new_tracks]:
+                self.track_grid.discard(hex_code)
+                del self.track_grid_keys[hex_code]
+            visible = self.track_grid.query(*bounds)
+            new_tracks = {h: key for h, key in new_tracks.items() if h in visible}
+
+        tracks = {}
+        for hex_code, key in new_tracks.items():
+            if self.map_tracks.get(hex_code) != key:
+                track = self.aircraft_tracks.view(hex_code)
+                tracks[hex_code] = track[:, TrackStore.LAT:TrackStore.LON + 1].tolist()
+
+        dropped_tracks = [hex_code for hex_code in self.map_tracks if hex_code not in new_tracks]
+
+        # 3. Airport markers coming into or going out of view
+        if PLOT_AIRPORTS != 1:
+            codes = set()
+        elif bounds is None:
+            codes = set(AIRPORT_LOCATIONS)
+        else:
+            codes = self.airport_grid.query(*bounds)
+        airports = []
+        for code, (lat, lon, status) in AIRPORT_LOCATIONS.items():
+            if code in codes and code not in self.map_airports:
+                # Towered airports are white, the rest gray
+                airports.append([code, lat, lon, "#FFFFFF" if status == "towered" else "#808080"])
+        dropped_airports = [code for code in self.map_airports if code not in codes]
+
+        self.map_state = new_state
+        self.map_clusters = new_clusters
+        self.map_labels = {hex_code for hex_code, row in new_state.items() if row[-1]}
+        self.map_tracks = new_tracks
+        self.map_airports = codes
+
+        # 4. Send the patch to the page
+        patch = {
+            'count': len(self.snapshot),
+            'aircraft': aircraft,
+            'remove': removed,
+            'tracks': tracks,
+            'drop_tracks': dropped_tracks,
+            'airports': airports,
+            'drop_airports': dropped_airports,
+            'clusters': changed_clusters,
+            'drop_clusters': dropped_clusters,
+        }
+        if self.native_map:
+            self.map_view.apply_patch(patch)
+        else:
+            self.run_map_js(f"adsbUpdate({json.dumps(patch, separators=(',', ':'))});")
 
     # --- REMOVED ALL PLOT UPDATE FUNCTIONS ---
     # update_scatter_dist_plot
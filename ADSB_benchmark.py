@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import subprocess
+
+# Run Qt without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+import ADSB_110725 as tracker_module
+from ADSB_fake_receiver import SyntheticTraffic
+
+# --- Benchmark Suite ---
+# Times each stage of the update path headlessly against fixed synthetic
+# fixtures, at several aircraft counts and history lengths:
+#
+#   python ADSB_benchmark.py --output results.json
+#   python ADSB_benchmark.py --output new.json --compare results.json
+#
+# Stages: parse (json.loads), process (process_aircraft_data), update_map
+# (patch generation; payload size recorded), map_page (full page render;
+# HTML size recorded) and each update_*_plot method. Every stage is timed
+# over all frames, then run once more per frame under tracemalloc for its
+# peak allocation.
+
+PLOT_STAGES = [
+    'update_scatter_dist_plot',
+    'update_hist_alt_plot',
+    'update_scatter_gs_plot',
+    'update_hist_gs_plot',
+]
+
+
+def make_frames(count, frames, seed=0):
+    """Returns a fixed sequence of raw aircraft.json snapshots, one second apart."""
+    traffic = SyntheticTraffic(count, tracker_module.RECEIVER_LAT, tracker_module.RECEIVER_LON,
+                               seed=seed + count)
+    now = traffic.last_step = 1700000000.0
+    raw = []
+    for _ in range(frames):
+        now += 1
+        traffic.step(now)
+        raw.append(json.dumps(traffic.snapshot(now), separators=(',', ':')).encode())
+    return raw
+
+
+def fill_history(tracker, samples, seed=0):
+    """Preloads the sample history (and histograms) with samples plausible points."""
+    if samples <= 0:
+        return
+    rng = np.random.default_rng(seed)
+    dist = rng.uniform(0, 200, samples)
+    alt = rng.uniform(0, 45000, samples)
+    gs = rng.uniform(0, 550, samples)
+    _, old_alt, old_gs = tracker.history.extend(dist, alt, gs)
+    tracker.alt_hist.add(alt)
+    tracker.alt_hist.remove(old_alt)
+    tracker.gs_hist.add(gs)
+    tracker.gs_hist.remove(old_gs)
+
+
+def wait_for_map(app, tracker, timeout=30):
+    """Spins the event loop until the map page has loaded."""
+    deadline = time.monotonic() + timeout
+    while not tracker.map_ready and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    if not tracker.map_ready:
+        print("Warning: Map page did not load; update_map will not be timed.")
+
+
+def summarize(samples_ms):
+    """Returns timing statistics (milliseconds) for a list of samples."""
+    values = np.asarray(samples_ms)
+    return {
+        'n': len(values),
+        'mean_ms': float(values.mean()),
+        'median_ms': float(np.median(values)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'max_ms': float(values.max()),
+    }
+
+
+def run_case(app, raw_frames, history, warmup):
+    """Benchmarks every stage for one aircraft count and history length."""
+    tracker = tracker_module.AdsbTracker(fetch=False)
+    wait_for_map(app, tracker)
+    fill_history(tracker, history)
+
+    # Record the size of each script sent to the map page
+    payloads = []
+    run_map_js = tracker.run_map_js
+
+    def record_map_js(script):
+        payloads.append(len(script.encode()))
+        run_map_js(script)
+    tracker.run_map_js = record_map_js
+
+    stages = ['parse', 'process', 'update_map'] + PLOT_STAGES
+    timings = {stage: [] for stage in stages}
+    peaks = {stage: 0 for stage in stages}
+    sizes = []
+
+    def run_frame(raw, traced):
+        """Runs every stage on one frame, timing (or tracing) each of them."""
+        results = {}
+
+        def measure(stage, func, *args):
+            if traced:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                result = func(*args)
+                peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1] - base)
+            else:
+                start = time.perf_counter()
+                result = func(*args)
+                results[stage] = (time.perf_counter() - start) * 1000
+            return result
+
+        data = measure('parse', json.loads, raw)
+        if not measure('process', tracker.process_aircraft_data, data):
+            raise RuntimeError("process_aircraft_data failed on a fixture frame")
+        del payloads[:]
+        measure('update_map', tracker.update_map)
+        if not traced:
+            sizes.append(sum(payloads))
+        for stage in PLOT_STAGES:
+            measure(stage, getattr(tracker, stage))
+        app.processEvents()
+        return results
+
+    for i, raw in enumerate(raw_frames):
+        results = run_frame(raw, traced=False)
+        if i >= warmup:
+            for stage, ms in results.items():
+                timings[stage].append(ms)
+
+    tracemalloc.start()
+    for raw in raw_frames[:warmup + 5]:
+        run_frame(raw, traced=True)
+    tracemalloc.stop()
+
+    rows = []
+    for stage in stages:
+        row = {'stage': stage, **summarize(timings[stage]), 'peak_alloc_bytes': peaks[stage]}
+        if stage == 'update_map':
+            row['payload_bytes_mean'] = float(np.mean(sizes[warmup:])) if sizes[warmup:] else 0.0
+        rows.append(row)
+
+    state = {
+        'track_bytes': int(tracker.aircraft_tracks.nbytes()),
+        'history_samples': len(tracker.history.distances),
+    }
+    tracker.close()
+    tracker.deleteLater()
+    app.processEvents()
+    return rows, state
+
+
+def bench_map_page(tracker_class):
+    """Times a full render of the map page HTML and returns its size."""
+    tracker = tracker_class(fetch=False)
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        html = tracker.build_map().get_root().render()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracker.close()
+    tracker.deleteLater()
+    return {'stage': 'map_page', **summarize(timings), 'html_bytes': len(html)}
+
+
+def environment():
+    """Describes the machine and code version the results came from."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import matplotlib
+    import folium
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'folium': folium.__version__,
+    }
+
+
+def compare(results, baseline_path):
+    """Prints the median time of each stage relative to an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r['aircraft'], r['history'], r['stage']): r for r in baseline['results']}
+    print(f"\nCompared with {baseline_path} ({baseline['environment'].get('commit')}):")
+    for r in results:
+        b = old.get((r['aircraft'], r['history'], r['stage']))
+        if b is None or not b['median_ms']:
+            continue
+        ratio = r['median_ms'] / b['median_ms']
+        print(f"  {r['aircraft']:>5} ac {r['history']:>8} hist {r['stage']:<26}"
+              f"{b['median_ms']:9.2f} -> {r['median_ms']:9.2f} ms  x{ratio:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ADSB tracker update stages')
+    parser.add_argument('--aircraft', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--history', type=int, nargs='+', default=[0, 100000, 1000000],
+                        help='samples preloaded into the plot history')
+    parser.add_argument('--frames', type=int, default=30, help='frames timed per case')
+    parser.add_argument('--warmup', type=int, default=3, help='frames run before timing starts')
+    parser.add_argument('--output', default='adsb_benchmark.json')
+    parser.add_argument('--compare', default=None, help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+
+    page = bench_map_page(tracker_module.AdsbTracker)
+    results.append({'aircraft': 0, 'history': 0, **page})
+    print(f"map_page: {page['median_ms']:.1f} ms, {page['html_bytes']} bytes")
+
+    for count in args.aircraft:
+        raw_frames = make_frames(count, args.frames + args.warmup)
+        for history in args.history:
+            rows, state = run_case(app, raw_frames, history, args.warmup)
+            for row in rows:
+                results.append({'aircraft': count, 'history': history, **row, **state})
+            summary = ', '.join(f"{r['stage']} {r['median_ms']:.2f}" for r in rows)
+            print(f"{count} aircraft, {history} history (median ms): {summary}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1593 @@
+import re
+import sys
+import json
+import os
+import time
+import socket
+import argparse
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+from ADSB_snapshot_log import SnapshotRecorder
+
+# --- Headless Processing Core ---
+# Ingest, normalization, tracks and statistics, with no Qt, folium or
+# matplotlib dependency. The map/plot front ends (ADSB_110725.py and
+# ADSB_110725_radaronly.py) drive an AdsbCore; so does the headless
+# collector below:
+#
+#   python ADSB_core.py --url http://192.168.4.93:8504/data/aircraft.json --record logs
+#   python ADSB_core.py --url sbs://192.168.4.93:30003
+#   python ADSB_core.py --url beast://192.168.4.93:30005 --lat 37.9555 --lon -121.6978
+
+# --- Aircraft Snapshot ---
+
+def to_float(value):
+    """Converts a raw aircraft.json number to float; 'N/A', None or junk become NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+class AircraftSnapshot:
+    """
+    One aircraft.json poll in columnar form.
+
+    Built once per poll by from_json(), which also normalizes the raw
+    fields: 'ground' altitudes become 0 (with on_ground set), missing or
+    'N/A' groundspeed and track become NaN, and callsigns are stripped.
+    Only aircraft with a position and an altitude are kept. The map,
+    plots and tracks all read these columns instead of re-parsing.
+
+    dist and bearing (from the receiver) and ref_dist (to every reference
+    point) are filled in by the tracker's distance pass, if it runs one.
+    """
+    def __init__(self, now, hex_codes, flights, lats, lons, alts, groundspeeds,
+                 tracks, seen, on_ground):
+        self.now = now
+        self.hex = hex_codes           # list of str
+        self.flight = flights          # list of str
+        self.lat = lats                # float64 arrays from here on
+        self.lon = lons
+        self.alt = alts                # feet, 0 when on the ground
+        self.gs = groundspeeds         # knots, NaN when unknown
+        self.track = tracks            # degrees, NaN when unknown
+        self.seen = seen               # seconds since last message
+        self.on_ground = on_ground     # bool array
+        self.dist = None
+        self.bearing = None
+        self.ref_dist = None
+
+    def __len__(self):
+        return len(self.hex)
+
+    @classmethod
+    def from_json(cls, data):
+        """Builds a snapshot from a parsed aircraft.json document."""
+        hex_codes, flights = [], []
+        lats, lons, alts, groundspeeds, tracks, seen, on_ground = [], [], [], [], [], [], []
+        
+        for ac in data.get('aircraft', []):
+            # We need lat, lon, and altitude to plot
+            lat = ac.get('lat')
+            lon = ac.get('lon')
+            
+            # Use barometric altitude, fall back to geometric
+            alt = ac.get('alt_baro', ac.get('alt_geom'))
+            
+            # Skip aircraft with no position or altitude
+            if lat is None or lon is None or alt is None:
+                continue
+            
+            # Handle 'ground' value for altitude
+            grounded = alt == 'ground'
+            if grounded:
+                alt = 0
+            
+            # Ensure alt is in a number
+            try:
+                alt_ft = float(alt)
+            except (TypeError, ValueError):
+                continue
+            
+            hex_codes.append(ac.get('hex', str(time.time()))) # Use time as fallback key
+            flights.append(ac.get('flight', 'N/A').strip())
+            lats.append(lat)
+            lons.append(lon)
+            alts.append(alt_ft)
+            groundspeeds.append(to_float(ac.get('gs')))
+            tracks.append(to_float(ac.get('track')))
+            seen.append(to_float(ac.get('seen', 0)))
+            on_ground.append(grounded)
+        
+        return cls(
+            data.get('now'),
+            hex_codes,
+            flights,
+            np.array(lats, dtype=float),
+            np.array(lons, dtype=float),
+            np.array(alts, dtype=float),
+            np.array(groundspeeds, dtype=float),
+            np.array(tracks, dtype=float),
+            np.array(seen, dtype=float),
+            np.array(on_ground, dtype=bool),
+        )
+
+
+# --- Track Store ---
+
+class TrackStore:
+    """
+    Fixed-capacity position history (lat, lon, alt, timestamp) per aircraft.
+
+    All tracks share one preallocated arena. Every point is written twice,
+    at i and i + capacity within its track's slot, so the newest points are
+    always one contiguous slice: view() is zero-copy and append() never
+    re-slices or allocates. Slots of removed tracks are reused; the arena
+    grows (by doubling) when every slot is taken, and is packed into a
+    smaller one when evict() or retain() leave most of it empty or it is
+    over the memory budget.
+    """
+    LAT, LON, ALT, TIME = range(4)
+
+    def __init__(self, capacity, initial_slots=256):
+        self.capacity = capacity
+        self.initial_slots = initial_slots
+        self.max_slots = 0 # Slots allowed by the last memory budget (0 = no limit)
+        self.arena = np.zeros((initial_slots, 2 * capacity, 4))
+        self.written = np.zeros(initial_slots, dtype=np.int64) # Points ever appended per slot
+        self.last_seen = np.zeros(initial_slots)               # Timestamp of the newest point
+        self.slots = {}                                        # hex -> slot
+        self.free = list(range(initial_slots - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, hex_code):
+        return hex_code in self.slots
+
+    def __iter__(self):
+        return iter(list(self.slots))
+
+    def slot_bytes(self):
+        """Memory held per slot (arena row and bookkeeping)."""
+        return self.arena[0].nbytes + self.written.itemsize + self.last_seen.itemsize
+
+    def _resize(self, slots):
+        """Moves the tracks into a new arena of `slots` slots, packed into the lowest ones."""
+        arena = np.zeros((slots, 2 * self.capacity, 4))
+        written = np.zeros(slots, dtype=np.int64)
+        last_seen = np.zeros(slots)
+        if self.slots:
+            old = np.fromiter(self.slots.values(), dtype=np.int64, count=len(self.slots))
+            new = np.arange(len(old))
+            arena[new] = self.arena[old]
+            written[new] = self.written[old]
+            last_seen[new] = self.last_seen[old]
+            self.slots = dict(zip(self.slots, new.tolist()))
+        self.arena, self.written, self.last_seen = arena, written, last_seen
+        self.free = list(range(slots - 1, len(self.slots) - 1, -1))
+
+    def _reserve(self, hex_codes):
+        """Makes room for the tracks of hex_codes, doubling the arena (within the memory budget) if needed."""
+        needed = len(self.slots) + len(set(hex_codes).difference(self.slots))
+        if needed > len(self.written):
+            grown = 2 * len(self.written)
+            if self.max_slots:
+                grown = min(grown, self.max_slots)
+            self._resize(max(needed, grown))
+
+    def _shrink(self):
+        """Packs the tracks into a smaller arena if they use under a quarter of it, or it is over budget."""
+        slots = len(self.written)
+        target = max(self.initial_slots, 2 * len(self.slots))
+        if self.max_slots:
+            target = min(target, self.max_slots)
+        target = max(target, len(self.slots))
+        if (len(self.slots) < slots // 4 and target < slots) or (self.max_slots and slots > self.max_slots):
+            self._resize(target)
+
+    def _slot(self, hex_code):
+        slot = self.slots.get(hex_code)
+        if slot is None:
+            slot = self.slots[hex_code] = self.free.pop()
+            self.written[slot] = 0
+        return slot
+
+    def append(self, hex_codes, lats, lons, alts, timestamp):
+        """Appends one point to each aircraft's track, as one batch."""
+        n = len(hex_codes)
+        if n == 0:
+            return
+        self._reserve(hex_codes)
+        slots = np.fromiter((self._slot(h) for h in hex_codes), dtype=np.int64, count=n)
+        pos = self.written[slots] % self.capacity
+        
+        rows = np.empty((n, 4))
+        rows[:, self.LAT] = lats
+        rows[:, self.LON] = lons
+        rows[:, self.ALT] = alts
+        rows[:, self.TIME] = timestamp
+        self.arena[slots, pos] = rows
+        self.arena[slots, pos + self.capacity] = rows
+        
+        self.written[slots] += 1
+        self.last_seen[slots] = timestamp
+
+    def points_written(self, hex_code):
+        """Number of points ever appended; changes whenever the track does."""
+        return int(self.written[self.slots[hex_code]])
+
+    def view(self, hex_code):
+        """Zero-copy (n, 4) view of a track, oldest point first."""
+        slot = self.slots[hex_code]
+        written = self.written[slot]
+        if written <= self.capacity:
+            return self.arena[slot, :written]
+        start = written % self.capacity
+        return self.arena[slot, start:start + self.capacity]
+
+    def latest(self, hex_codes):
+        """(n, 4) array of the newest point of each track, as one batch."""
+        slots = np.fromiter((self.slots[h] for h in hex_codes), dtype=np.int64, count=len(hex_codes))
+        return self.arena[slots, (self.written[slots] - 1) % self.capacity]
+
+    def remove(self, hex_code):
+        """Drops a track and frees its slot."""
+        slot = self.slots.pop(hex_code)
+        self.written[slot] = 0
+        self.free.append(slot)
+
+    def nbytes(self):
+        """Memory held by the arena and its bookkeeping arrays."""
+        return self.arena.nbytes + self.written.nbytes + self.last_seen.nbytes
+
+    def evict(self, now, max_age=0, max_count=0, max_bytes=0):
+        """
+        Drops tracks that are too old, then least-recently-seen tracks
+        until the count and memory limits are met (0 = no limit). The
+        arena is then shrunk to fit max_bytes, and later growth stays
+        within it.
+
+        Returns the number of tracks dropped for each reason.
+        """
+        dropped = {'age': 0, 'count': 0, 'memory': 0}
+        
+        # 1. Too long since the last position
+        if max_age > 0:
+            for hex_code in [h for h, slot in self.slots.items()
+                             if now - self.last_seen[slot] > max_age]:
+                self.remove(hex_code)
+                dropped['age'] += 1
+        
+        # 2. Track count and memory budget, least recently seen first
+        limits = []
+        if max_count > 0:
+            limits.append(('count', max_count))
+        self.max_slots = max(1, int(max_bytes // self.slot_bytes())) if max_bytes > 0 else 0
+        if self.max_slots:
+            limits.append(('memory', self.max_slots))
+        for reason, limit in limits:
+            excess = len(self.slots) - limit
+            if excess <= 0:
+                continue
+            # Ties (same last update) drop the shortest tracks first
+            by_age = sorted(self.slots.items(),
+                            key=lambda item: (self.last_seen[item[1]], self.written[item[1]]))
+            for hex_code, _ in by_age[:excess]:
+                self.remove(hex_code)
+                dropped[reason] += 1
+        
+        self._shrink()
+        return dropped
+
+    def retain(self, hex_codes):
+        """Drops every track whose aircraft is not in hex_codes."""
+        keep = set(hex_codes)
+        for hex_code in [h for h in self.slots if h not in keep]:
+            self.remove(hex_code)
+        self._shrink()
+
+
+# --- Geodesy ---
+
+EARTH_RADIUS_MILES = 3958.7613 # Mean Earth radius (same as the haversine package)
+
+def range_and_bearing(ref_lats, ref_lons, lats, lons):
+    """
+    Great-circle distance (miles) and initial bearing (degrees true) from
+    every reference point to every aircraft, in one vectorized pass.
+
+    Returns two arrays of shape (len(ref_lats), len(lats)).
+    """
+    phi1 = np.radians(np.asarray(ref_lats, dtype=float))[:, None]
+    lam1 = np.radians(np.asarray(ref_lons, dtype=float))[:, None]
+    phi2 = np.radians(np.asarray(lats, dtype=float))[None, :]
+    lam2 = np.radians(np.asarray(lons, dtype=float))[None, :]
+    d_phi = phi2 - phi1
+    d_lam = lam2 - lam1
+    
+    # Haversine distance
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lam / 2) ** 2
+    distance = 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    
+    # Initial bearing
+    y = np.sin(d_lam) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(d_lam)
+    bearing = np.degrees(np.arctan2(y, x)) % 360
+    
+    return distance, bearing
+
+
+# --- State Outline Cache ---
+
+# State outline source and cache format version (bump to invalidate caches)
+STATE_GEOJSON_BASE_URL = "https://raw.githubusercontent.com/glynnbird/usstatesgeojson/master/"
+STATE_CACHE_VERSION = 1
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker simplification of a list of [lon, lat] points."""
+    if len(points) < 3:
+        return points
+    
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first][0], points[first][1]
+        x2, y2 = points[last][0], points[last][1]
+        dx, dy = x2 - x1, y2 - y1
+        seg_len = (dx * dx + dy * dy) ** 0.5
+        
+        # Find the point farthest from the first-last segment
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = points[i][0], points[i][1]
+            if seg_len == 0:
+                dist = ((px - x1) ** 2 + (py - y1) ** 2) ** 0.5
+            else:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / seg_len
+            if dist > max_dist:
+                max_dist, index = dist, i
+        
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_geometry(geometry, tolerance):
+    """Simplifies a GeoJSON LineString/Polygon/MultiPolygon geometry."""
+    def ring(points):
+        simplified = simplify_line(points, tolerance)
+        # A closed ring needs at least 4 points; keep tiny islands as-is
+        return simplified if len(simplified) >= 4 else points
+    
+    geom_type = geometry.get('type')
+    coords = geometry.get('coordinates')
+    if geom_type == 'LineString':
+        coords = simplify_line(coords, tolerance)
+    elif geom_type == 'MultiLineString':
+        coords = [simplify_line(line, tolerance) for line in coords]
+    elif geom_type == 'Polygon':
+        coords = [ring(r) for r in coords]
+    elif geom_type == 'MultiPolygon':
+        coords = [[ring(r) for r in polygon] for polygon in coords]
+    return {'type': geom_type, 'coordinates': coords}
+
+
+def load_state_feature(state_file, cache_dir, tolerance):
+    """
+    Returns one state outline Feature, simplified to tolerance degrees.
+
+    Tries the current cache file in cache_dir first, then downloads (and
+    caches) the outline, then falls back to any older cached version of it.
+    """
+    name = os.path.splitext(state_file)[0]
+    cache_file = os.path.join(
+        cache_dir,
+        f"{name}.v{STATE_CACHE_VERSION}.tol{tolerance:g}.geojson"
+    )
+    
+    # 1. Current cache: no network needed
+    if os.path.exists(cache_file):
+        with open(cache_file) as f:
+            return json.load(f)
+    
+    # 2. Download, simplify once, and cache
+    try:
+        response = requests.get(STATE_GEOJSON_BASE_URL + state_file, timeout=10)
+        response.raise_for_status() # Check for download errors
+        
+        # Each file is a single GeoJSON "Feature" object
+        feature = response.json()
+        if feature.get('geometry'):
+            feature['geometry'] = simplify_geometry(feature['geometry'], tolerance)
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(feature, f, separators=(',', ':'))
+        os.replace(tmp_file, cache_file) # Never leave a half-written cache file
+        return feature
+    except (requests.exceptions.RequestException, ValueError, OSError) as e:
+        print(f"Warning: Could not download {state_file}: {e}")
+    
+    # 3. Offline fallback: any cached version of this state
+    if os.path.isdir(cache_dir):
+        for cached in sorted(os.listdir(cache_dir), reverse=True):
+            if cached.startswith(name + ".") and cached.endswith(".geojson"):
+                print(f"Using cached outline {cached}")
+                with open(os.path.join(cache_dir, cached)) as f:
+                    return json.load(f)
+    
+    raise FileNotFoundError(f"No cached or downloadable outline for {state_file}")
+
+
+
+# --- Spatial Index ---
+
+class SpatialGrid:
+    """
+    Uniform lat/lon grid over keyed objects (aircraft, tracks, airports).
+
+    Each key is filed under every cell one of its points falls in. set()
+    only touches the grid when that cell set changes, so objects that stay
+    in their cells cost nothing to maintain from one tick to the next.
+    query() returns the keys filed under the cells overlapping a box: a
+    superset, to within one cell, of the objects inside it.
+    """
+    def __init__(self, cell_deg=0.25):
+        self.cell_deg = cell_deg
+        self.cells = {}      # cell id -> set of keys
+        self.key_cells = {}  # key -> frozenset of cell ids
+
+    def cells_of(self, lats, lons):
+        """Returns the cell ids of the given points (NaN points are skipped)."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        rows = np.floor(lats[ok] / self.cell_deg).astype(np.int64)
+        cols = np.floor(lons[ok] / self.cell_deg).astype(np.int64)
+        return frozenset(np.unique((rows << 16) + cols).tolist())
+
+    def set(self, key, lats, lons):
+        """Files key under the cells of its points, replacing its old cells."""
+        self._move(key, self.cells_of(lats, lons))
+
+    def set_points(self, keys, lats, lons):
+        """Files many single-point objects at once (e.g. every aircraft in a snapshot)."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        rows = np.floor(np.where(ok, lats, 0) / self.cell_deg).astype(np.int64)
+        cols = np.floor(np.where(ok, lons, 0) / self.cell_deg).astype(np.int64)
+        ids = ((rows << 16) + cols).tolist()
+        for key, cell, valid in zip(keys, ids, ok.tolist()):
+            cells = frozenset((cell,)) if valid else frozenset()
+            if self.key_cells.get(key) != cells:
+                self._move(key, cells)
+
+    def add_points(self, keys, lats, lons):
+        """Adds one point to each key's cells, keeping the cells it already has."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        rows = np.floor(np.where(ok, lats, 0) / self.cell_deg).astype(np.int64)
+        cols = np.floor(np.where(ok, lons, 0) / self.cell_deg).astype(np.int64)
+        ids = ((rows << 16) + cols).tolist()
+        for key, cell, valid in zip(keys, ids, ok.tolist()):
+            old = self.key_cells.get(key, frozenset())
+            if valid and cell not in old:
+                self._move(key, old | {cell})
+
+    def _move(self, key, cells):
+        old = self.key_cells.get(key, frozenset())
+        if old == cells:
+            return
+        for cell in old - cells:
+            members = self.cells[cell]
+            members.discard(key)
+            if not members:
+                del self.cells[cell]
+        for cell in cells - old:
+            self.cells.setdefault(cell, set()).add(key)
+        self.key_cells[key] = cells
+
+    def discard(self, key):
+        """Removes key from the grid, if it is there."""
+        if key in self.key_cells:
+            self._move(key, frozenset())
+            del self.key_cells[key]
+
+    def retain(self, keys):
+        """Removes every key not in keys."""
+        keys = set(keys)
+        for key in [k for k in self.key_cells if k not in keys]:
+            self.discard(key)
+
+    def query(self, south, west, north, east):
+        """Returns the set of keys in the cells overlapping the box."""
+        row0, row1 = int(np.floor(south / self.cell_deg)), int(np.floor(north / self.cell_deg))
+        col0, col1 = int(np.floor(west / self.cell_deg)), int(np.floor(east / self.cell_deg))
+        found = set()
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.cells):
+            # Zoomed far out: cheaper to test every occupied cell
+            for cell, members in self.cells.items():
+                row, col = (cell + 32768) >> 16, ((cell + 32768) & 0xFFFF) - 32768
+                if row0 <= row <= row1 and col0 <= col <= col1:
+                    found |= members
+            return found
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                members = self.cells.get((row << 16) + col)
+                if members:
+                    found |= members
+        return found
+
+    def __len__(self):
+        return len(self.key_cells)
+
+
+# --- Map Level of Detail ---
+
+def mercator_pixels(lats, lons, zoom):
+    """Web Mercator pixel coordinates of points at a (fractional) zoom level, as Leaflet uses."""
+    scale = 256 * 2.0 ** zoom
+    lat = np.radians(np.clip(np.asarray(lats, dtype=float), -85.0511, 85.0511))
+    x = scale * (np.asarray(lons, dtype=float) + 180) / 360
+    y = scale * (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+    return x, y
+
+
+def grid_clusters(x, y, cell_px):
+    """
+    Groups screen points by the cell_px-square cell they fall in.
+
+    Returns (cells, inverse, counts): the id of every occupied cell, the
+    index into cells of every point, and the number of points per cell.
+    """
+    ids = (np.floor(y / cell_px).astype(np.int64) << 32) + np.floor(x / cell_px).astype(np.int64)
+    return np.unique(ids, return_inverse=True, return_counts=True)
+
+
+def place_labels(x, y, width, height, order):
+    """
+    Greedy screen-space label placement. Walks the points in order and
+    keeps a label (a width x height box at its point) only if it does not
+    overlap a label already kept; a grid of label-sized cells limits each
+    test to the 3 x 3 neighbouring cells. Returns a boolean mask.
+    """
+    keep = np.zeros(len(x), dtype=bool)
+    cols = np.floor(np.asarray(x) / width).astype(np.int64).tolist()
+    rows = np.floor(np.asarray(y) / height).astype(np.int64).tolist()
+    xs, ys = np.asarray(x).tolist(), np.asarray(y).tolist()
+    placed = {} # (col, row) -> [(x, y), ...] of kept labels
+    for i in np.asarray(order).tolist():
+        col, row, px, py = cols[i], rows[i], xs[i], ys[i]
+        clear = True
+        for c in (col - 1, col, col + 1):
+            for r in (row - 1, row, row + 1):
+                for qx, qy in placed.get((c, r), ()):
+                    if abs(qx - px) < width and abs(qy - py) < height:
+                        clear = False
+                        break
+                if not clear:
+                    break
+            if not clear:
+                break
+        if clear:
+            keep[i] = True
+            placed.setdefault((col, row), []).append((px, py))
+    return keep
+
+
+# --- Statistics ---
+
+class SampleHistory:
+    """
+    Fixed-capacity ring buffer for the distance/altitude/groundspeed samples
+    behind the plots.
+
+    Memory stays flat: once full, the oldest samples are overwritten. The
+    plots don't care about sample order, so the filled part of each column
+    is handed out directly as a contiguous array view. Missing groundspeeds
+    are stored as NaN.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0    # Number of valid samples
+        self.next = 0     # Next write position
+        self._distances = np.empty(capacity, dtype=np.float32)
+        self._altitudes = np.empty(capacity, dtype=np.float32)
+        self._groundspeeds = np.empty(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def distances(self):
+        return self._distances[:self.count]
+
+    @property
+    def altitudes(self):
+        return self._altitudes[:self.count]
+
+    @property
+    def groundspeeds(self):
+        return self._groundspeeds[:self.count]
+
+    def extend(self, distances, altitudes, groundspeeds):
+        """
+        Appends one batch of samples (None groundspeeds become NaN).
+
+        Returns the (distances, altitudes, groundspeeds) samples that were
+        overwritten to make room, so running totals can drop them.
+        """
+        columns = [
+            np.asarray(distances, dtype=np.float32),
+            np.asarray(altitudes, dtype=np.float32),
+            np.array(groundspeeds, dtype=np.float32), # None -> NaN
+        ]
+        buffers = (self._distances, self._altitudes, self._groundspeeds)
+        n = len(columns[0])
+        if n > self.capacity:
+            # Only the newest samples fit
+            columns = [col[-self.capacity:] for col in columns]
+            n = self.capacity
+        
+        # Slots about to be written that still hold valid samples
+        slots = (self.next + np.arange(n)) % self.capacity
+        slots = slots[slots < self.count]
+        evicted = tuple(buf[slots] for buf in buffers)
+        if n == 0:
+            return evicted
+        
+        start = self.next
+        end = start + n
+        first = min(end, self.capacity) - start # Samples before the wrap
+        for buf, col in zip(buffers, columns):
+            buf[start:start + first] = col[:first]
+            buf[:n - first] = col[first:]
+        
+        self.next = end % self.capacity
+        self.count = min(self.count + n, self.capacity)
+        return evicted
+
+
+class RollingHistogram:
+    """
+    Fixed-bin histogram counts that are updated incrementally.
+
+    Each update only bins the new samples (and the ones SampleHistory
+    evicted), instead of re-binning the whole history. Values outside
+    the range and NaNs are ignored, like ax.hist(range=...).
+    """
+    def __init__(self, bins, value_range):
+        self.edges = np.linspace(value_range[0], value_range[1], bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def add(self, values):
+        """Counts new samples."""
+        self.counts += self._bin(values)
+
+    def remove(self, values):
+        """Un-counts evicted samples."""
+        self.counts -= self._bin(values)
+
+    def _bin(self, values):
+        values = np.asarray(values, dtype=np.float32)
+        counts, _ = np.histogram(values[~np.isnan(values)], bins=self.edges)
+        return counts
+
+
+# --- Ingest ---
+
+class SnapshotPoller:
+    """
+    HTTP ingest for aircraft.json.
+
+    Keeps one keep-alive session and sends conditional GETs. Snapshots the
+    receiver has not updated since the last poll (HTTP 304, or the same
+    "now"/"messages" stamp) are dropped before parsing. Not thread-safe:
+    use it from one thread at a time.
+    """
+    # dump1090 writes "now" and "messages" at the top of aircraft.json,
+    # so the stamp can be read without parsing the whole document
+    STAMP_PATTERN = re.compile(rb'"now"\s*:\s*([0-9.]+)\s*,\s*"messages"\s*:\s*([0-9]+)')
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Validators for conditional GETs
+        self.etag = None
+        self.last_modified = None
+        # ("now", "messages") of the last snapshot delivered
+        self.last_stamp = None
+
+    def poll(self):
+        """
+        Fetches one snapshot.
+
+        Returns (data, raw_bytes, http_ms, parse_ms), or None if nothing
+        changed. Raises requests.RequestException or ValueError on failure.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        
+        start = time.perf_counter()
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        http_ms = (time.perf_counter() - start) * 1000
+        if response.status_code == 304:
+            return None # Not modified since the last poll
+        response.raise_for_status() # Raise an error for bad responses
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        
+        # Fast path: same stamp as last time means a duplicate snapshot
+        content = response.content
+        match = self.STAMP_PATTERN.search(content, 0, 256)
+        if match:
+            stamp = (float(match.group(1)), int(match.group(2)))
+            if stamp == self.last_stamp:
+                return None
+        
+        start = time.perf_counter()
+        data = json.loads(content)
+        parse_ms = (time.perf_counter() - start) * 1000
+        
+        stamp = (data.get('now'), data.get('messages'))
+        if stamp == self.last_stamp:
+            return None
+        self.last_stamp = stamp
+        return data, content, http_ms, parse_ms
+
+    def close(self):
+        self.session.close()
+
+
+class AircraftStateTable:
+    """
+    Per-aircraft state built up from individual messages (SBS-1 lines,
+    decoded Mode-S frames), rather than whole aircraft.json snapshots.
+
+    to_json() renders the table as an aircraft.json document, with seen and
+    seen_pos relative to the render time, so everything downstream of the
+    ingest consumes streamed state exactly like a polled snapshot.
+    Aircraft not heard from for expire_seconds are dropped.
+    """
+    def __init__(self, expire_seconds=60):
+        self.expire_seconds = expire_seconds
+        self.aircraft = {}  # hex -> aircraft.json-style fields
+        self.seen = {}      # hex -> time of the last message
+        self.seen_pos = {}  # hex -> time of the last position
+        self.messages = 0
+
+    def update(self, hex_code, now, fields):
+        """Merges one message's fields into an aircraft's state."""
+        ac = self.aircraft.get(hex_code)
+        if ac is None:
+            ac = self.aircraft[hex_code] = {'hex': hex_code}
+        ac.update(fields)
+        self.seen[hex_code] = now
+        if 'lat' in fields:
+            self.seen_pos[hex_code] = now
+        self.messages += 1
+
+    def expire(self, now):
+        """Drops aircraft not heard from for expire_seconds; returns how many."""
+        expired = [h for h, t in self.seen.items() if now - t > self.expire_seconds]
+        for hex_code in expired:
+            del self.aircraft[hex_code]
+            del self.seen[hex_code]
+            self.seen_pos.pop(hex_code, None)
+        return len(expired)
+
+    def to_json(self, now):
+        """Returns the current state as an aircraft.json dictionary."""
+        self.expire(now)
+        aircraft = []
+        for hex_code, ac in self.aircraft.items():
+            entry = dict(ac)
+            entry['seen'] = round(now - self.seen[hex_code], 1)
+            if hex_code in self.seen_pos:
+                entry['seen_pos'] = round(now - self.seen_pos[hex_code], 1)
+            aircraft.append(entry)
+        return {'now': round(now, 1), 'messages': self.messages, 'aircraft': aircraft}
+
+
+class StreamPoller(ABC):
+    """
+    Base for streaming ingest: keeps a TCP connection to the receiver open
+    and, on each poll(), decodes whatever arrived since the last one into
+    an AircraftStateTable.
+
+    poll() has the same interface as SnapshotPoller.poll(), returning None
+    if no message arrived and no aircraft expired. The socket is
+    non-blocking and only read from poll(), so the stream costs bandwidth
+    in proportion to message traffic and no extra thread. Subclasses
+    implement decode(), which consumes complete messages from the buffer
+    and returns the bytes left over.
+    """
+    default_port = None
+
+    def __init__(self, host, port=None, timeout=2.0, expire_seconds=60):
+        self.host = host
+        self.port = port or self.default_port
+        self.timeout = timeout
+        self.sock = None
+        self.buffer = b''
+        self.table = AircraftStateTable(expire_seconds)
+        self.last_messages = 0
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setblocking(False)
+        self.buffer = b''
+
+    def read(self):
+        """Returns everything received since the last call. Raises ConnectionError if the feed closed."""
+        chunks = []
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                self.close()
+                raise ConnectionError(f"{self.host}:{self.port} closed the connection")
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def poll(self):
+        """Decodes the messages received since the last poll and returns the state."""
+        if self.sock is None:
+            self.connect()
+        
+        start = time.perf_counter()
+        self.buffer += self.read()
+        read_ms = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        now = time.time()
+        self.buffer = self.decode(self.buffer, now)
+        # Expire on every poll, so aircraft still leave when the feed goes quiet
+        expired = self.table.expire(now)
+        if self.table.messages == self.last_messages and not expired:
+            return None # Nothing new
+        self.last_messages = self.table.messages
+        data = self.table.to_json(now)
+        content = json.dumps(data, separators=(',', ':')).encode()
+        decode_ms = (time.perf_counter() - start) * 1000
+        return data, content, read_ms, decode_ms
+
+    @abstractmethod
+    def decode(self, buffer, now):
+        """Applies the complete messages in buffer to self.table; returns the unconsumed tail."""
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class SbsStreamPoller(StreamPoller):
+    """
+    Streaming ingest from dump1090's SBS-1 (BaseStation) output, port 30003.
+
+    Each "MSG" line updates only the fields it carries: callsign (type 1),
+    surface and airborne positions (2, 3), velocity (4) and altitude (5, 7).
+    """
+    default_port = 30003
+
+    # Field positions in an SBS-1 MSG line
+    HEX, CALLSIGN, ALT, GS, TRACK, LAT, LON, VRATE, SQUAWK, GROUND = 4, 10, 11, 12, 13, 14, 15, 16, 17, 21
+
+    def decode(self, buffer, now):
+        """Applies every complete line in buffer; returns the incomplete tail."""
+        *lines, rest = buffer.split(b'\n')
+        update = self.table.update
+        for line in lines:
+            parts = line.decode('ascii', 'replace').strip().split(',')
+            if len(parts) < 22 or parts[0] != 'MSG' or not parts[self.HEX]:
+                continue
+            fields = {}
+            try:
+                if parts[self.CALLSIGN].strip():
+                    fields['flight'] = parts[self.CALLSIGN]
+                if parts[self.GROUND] == '-1':
+                    fields['alt_baro'] = 'ground'
+                elif parts[self.ALT]:
+                    fields['alt_baro'] = int(float(parts[self.ALT]))
+                if parts[self.GS]:
+                    fields['gs'] = float(parts[self.GS])
+                if parts[self.TRACK]:
+                    fields['track'] = float(parts[self.TRACK])
+                if parts[self.LAT] and parts[self.LON]:
+                    fields['lat'] = float(parts[self.LAT])
+                    fields['lon'] = float(parts[self.LON])
+                if parts[self.VRATE]:
+                    fields['baro_rate'] = int(float(parts[self.VRATE]))
+            except ValueError:
+                continue # Garbled line
+            if parts[self.SQUAWK]:
+                fields['squawk'] = parts[self.SQUAWK]
+            update(parts[self.HEX].strip().lower(), now, fields)
+        if len(rest) > 65536:
+            rest = b'' # Not a line-based feed; don't grow without bound
+        return rest
+
+
+# --- Mode-S Decoding ---
+
+def modes_crc_table():
+    """Byte-wise lookup table for the Mode-S CRC-24 (generator 0xFFF409)."""
+    table = np.zeros(256, dtype=np.uint32)
+    for i in range(256):
+        c = i << 16
+        for _ in range(8):
+            c = ((c << 1) ^ 0xFFF409) if c & 0x800000 else c << 1
+        table[i] = c & 0xFFFFFF
+    return table
+
+MODES_CRC_TABLE = modes_crc_table()
+
+
+def modes_crc(frames):
+    """CRC-24 remainder of the first 88 bits of each 112-bit frame (one row per frame)."""
+    reg = np.zeros(len(frames), dtype=np.uint32)
+    for k in range(11):
+        reg = ((reg << 8) & 0xFFFFFF) ^ MODES_CRC_TABLE[((reg >> 16) ^ frames[:, k]) & 0xFF]
+    return reg
+
+
+def cpr_nl(lat):
+    """Number of CPR longitude zones at each latitude."""
+    lat = np.abs(lat)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = 1 - (1 - np.cos(np.pi / 30)) / np.cos(np.radians(lat)) ** 2
+        nl = np.floor(2 * np.pi / np.arccos(np.clip(a, -1, 1)))
+    nl = np.where(lat == 0, 59, nl)
+    return np.where(lat > 87, 1, np.where(lat == 87, 2, nl))
+
+
+def cpr_global(lat_even, lon_even, lat_odd, lon_odd, odd_newest):
+    """
+    Globally unambiguous airborne positions from even/odd CPR pairs
+    (fractions of 2^17). Returns (lat, lon, valid); pairs that straddle a
+    longitude zone boundary are not valid.
+    """
+    j = np.floor(59 * lat_even - 60 * lat_odd + 0.5)
+    rlat_even = 360 / 60 * (np.mod(j, 60) + lat_even)
+    rlat_odd = 360 / 59 * (np.mod(j, 59) + lat_odd)
+    rlat_even = np.where(rlat_even >= 270, rlat_even - 360, rlat_even)
+    rlat_odd = np.where(rlat_odd >= 270, rlat_odd - 360, rlat_odd)
+    valid = cpr_nl(rlat_even) == cpr_nl(rlat_odd)
+    
+    lat = np.where(odd_newest, rlat_odd, rlat_even)
+    nl = cpr_nl(lat)
+    ni = np.maximum(nl - odd_newest, 1)
+    m = np.floor(lon_even * (nl - 1) - lon_odd * nl + 0.5)
+    lon = 360 / ni * (np.mod(m, ni) + np.where(odd_newest, lon_odd, lon_even))
+    lon = np.where(lon >= 180, lon - 360, lon)
+    return lat, lon, valid
+
+
+def cpr_local(lat_cpr, lon_cpr, odd, ref_lat, ref_lon):
+    """Airborne positions from single CPR messages, relative to a reference within 180 NM."""
+    dlat = 360 / (60 - odd)
+    j = np.floor(ref_lat / dlat) + np.floor(0.5 + np.mod(ref_lat, dlat) / dlat - lat_cpr)
+    lat = dlat * (j + lat_cpr)
+    dlon = 360 / np.maximum(cpr_nl(lat) - odd, 1)
+    m = np.floor(ref_lon / dlon) + np.floor(0.5 + np.mod(ref_lon, dlon) / dlon - lon_cpr)
+    return lat, dlon * (m + lon_cpr)
+
+
+class ModeSDecoder:
+    """
+    Batched decoder for ADS-B extended squitters (DF17, and DF18 with CF=0).
+
+    decode() takes a whole burst of 112-bit frames as one (n, 14) byte array:
+    CRC checks, field extraction, callsigns, velocities, altitudes and CPR
+    positions are computed with array operations across the burst, and
+    only the final per-aircraft updates are done one message at a time.
+    Handles identification (TC 1-4), airborne position with barometric
+    altitude (TC 9-18) and airborne velocity over ground (TC 19, subtypes
+    1 and 2).
+
+    Positions are decoded relative to the aircraft's last position if it
+    is recent, else from an even/odd pair received within PAIR_SECONDS,
+    else relative to the receiver (if given). Receiver-relative positions
+    are reported but never used as the aircraft's reference, so a wrong
+    receiver location only matters until the first even/odd pair.
+    """
+    CHARSET = '#ABCDEFGHIJKLMNOPQRSTUVWXYZ##### ###############0123456789######'
+    PAIR_SECONDS = 10
+    REF_SECONDS = 60
+
+    def __init__(self, receiver=None):
+        self.receiver = receiver      # (lat, lon) or None
+        self.cpr = {}                 # hex -> [even, odd], each (lat_cpr, lon_cpr, time) or None
+        self.positions = {}           # hex -> (lat, lon, time) of the last decoded position
+        self.frames = 0               # Frames seen
+        self.crc_errors = 0           # Extended squitters dropped by the CRC check
+        self.pruned = 0.0
+
+    @staticmethod
+    def bits(me, start, length):
+        """Field of the 56-bit ME word: 1-indexed start bit, as in the ADS-B spec."""
+        shift = np.uint64(56 - (start - 1) - length)
+        return ((me >> shift) & np.uint64((1 << length) - 1)).astype(np.int64)
+
+    def decode(self, frames, now, table):
+        """Decodes a burst of 112-bit frames and applies them to an AircraftStateTable."""
+        frames = np.asarray(frames, dtype=np.uint8).reshape(-1, 14)
+        self.frames += len(frames)
+        df = frames[:, 0] >> 3
+        squitter = (df == 17) | ((df == 18) & ((frames[:, 0] & 7) == 0))
+        parity = (frames[:, 11].astype(np.uint32) << 16) | (frames[:, 12].astype(np.uint32) << 8) | frames[:, 13]
+        good = squitter & (modes_crc(frames) == parity)
+        self.crc_errors += int((squitter & ~good).sum())
+        frames = frames[good]
+        n = len(frames)
+        if n == 0:
+            return
+        
+        icao = (frames[:, 1].astype(np.int64) << 16) | (frames[:, 2].astype(np.int64) << 8) | frames[:, 3]
+        me = np.zeros(n, dtype=np.uint64)
+        for k in range(4, 11):
+            me = (me << np.uint64(8)) | frames[:, k].astype(np.uint64)
+        tc = self.bits(me, 1, 5)
+        hex_codes = [f'{x:06x}' for x in icao.tolist()]
+        fields = [{} for _ in range(n)]
+        
+        # 1. Identification: eight 6-bit characters
+        idx = np.flatnonzero((tc >= 1) & (tc <= 4))
+        if len(idx):
+            shifts = np.arange(42, -1, -6, dtype=np.uint64)
+            chars = ((me[idx, None] >> shifts) & np.uint64(63)).astype(np.int64)
+            for i, row in zip(idx.tolist(), chars.tolist()):
+                fields[i]['flight'] = ''.join(self.CHARSET[c] for c in row).replace('#', '').strip()
+        
+        # 2. Airborne velocity over ground
+        subtype = self.bits(me, 6, 3)
+        idx = np.flatnonzero((tc == 19) & ((subtype == 1) | (subtype == 2)))
+        if len(idx):
+            v = me[idx]
+            scale = np.where(subtype[idx] == 2, 4, 1)
+            v_ew = self.bits(v, 15, 10)
+            v_ns = self.bits(v, 26, 10)
+            vx = (v_ew - 1) * scale * np.where(self.bits(v, 14, 1), -1, 1)
+            vy = (v_ns - 1) * scale * np.where(self.bits(v, 25, 1), -1, 1)
+            gs = np.hypot(vx, vy)
+            track = np.degrees(np.arctan2(vx, vy)) % 360
+            vr = self.bits(v, 38, 9)
+            rate = (vr - 1) * 64 * np.where(self.bits(v, 37, 1), -1, 1)
+            known = (v_ew > 0) & (v_ns > 0)
+            for k, i in enumerate(idx.tolist()):
+                if known[k]:
+                    fields[i]['gs'] = round(float(gs[k]), 1)
+                    fields[i]['track'] = round(float(track[k]), 1)
+                if vr[k] > 0:
+                    fields[i]['baro_rate'] = int(rate[k])
+        
+        # 3. Airborne position and barometric altitude
+        idx = np.flatnonzero((tc >= 9) & (tc <= 18))
+        if len(idx):
+            self.decode_positions(idx, me[idx], hex_codes, fields, now)
+        
+        for hex_code, message in zip(hex_codes, fields):
+            table.update(hex_code, now, message)
+        
+        # Forget CPR state of aircraft that went quiet
+        if now - self.pruned > self.REF_SECONDS:
+            self.pruned = now
+            for hex_code in [h for h, p in self.positions.items() if now - p[2] > self.REF_SECONDS]:
+                del self.positions[hex_code]
+            for hex_code in [h for h, pair in self.cpr.items()
+                             if all(c is None or now - c[2] > self.PAIR_SECONDS for c in pair)]:
+                del self.cpr[hex_code]
+
+    def decode_positions(self, idx, me, hex_codes, fields, now):
+        """Decodes the airborne position messages at idx (in arrival order)."""
+        a12 = self.bits(me, 9, 12)
+        q = (a12 >> 4) & 1
+        # 0 means no altitude; Q=0 (Gillham) altitudes are not decoded
+        valid_alt = (q == 1) & (a12 != 0)
+        alt = (((a12 >> 5) << 4) | (a12 & 15)) * 25 - 1000
+        odd = self.bits(me, 22, 1)
+        lat_cpr = self.bits(me, 23, 17) / 131072
+        lon_cpr = self.bits(me, 40, 17) / 131072
+        
+        # Pair each message with the latest opposite-parity one, and find a reference
+        n = len(idx)
+        pair = np.zeros((n, 4))
+        has_pair = np.zeros(n, dtype=bool)
+        ref = np.full((n, 2), np.nan)
+        own_ref = np.zeros(n, dtype=bool)
+        for k, i in enumerate(idx.tolist()):
+            hex_code = hex_codes[i]
+            entry = self.cpr.setdefault(hex_code, [None, None])
+            entry[odd[k]] = (lat_cpr[k], lon_cpr[k], now)
+            other = entry[1 - odd[k]]
+            if other is not None and now - other[2] <= self.PAIR_SECONDS:
+                even, odd_msg = (entry[0], other) if odd[k] == 0 else (other, entry[1])
+                pair[k] = (even[0], even[1], odd_msg[0], odd_msg[1])
+                has_pair[k] = True
+            last = self.positions.get(hex_code)
+            if last is not None and now - last[2] <= self.REF_SECONDS:
+                ref[k] = last[:2]
+                own_ref[k] = True
+            elif self.receiver is not None:
+                ref[k] = self.receiver
+        
+        g_lat, g_lon, g_valid = cpr_global(pair[:, 0], pair[:, 1], pair[:, 2], pair[:, 3], odd)
+        l_lat, l_lon = cpr_local(lat_cpr, lon_cpr, odd, ref[:, 0], ref[:, 1])
+        use_global = has_pair & g_valid & ~own_ref
+        lat = np.where(use_global, g_lat, l_lat)
+        lon = np.where(use_global, g_lon, l_lon)
+        lon = np.where(lon >= 180, lon - 360, lon)
+        
+        for k, i in enumerate(idx.tolist()):
+            if valid_alt[k]:
+                fields[i]['alt_baro'] = int(alt[k])
+            if np.isfinite(lat[k]) and np.isfinite(lon[k]) and abs(lat[k]) <= 90:
+                fields[i]['lat'] = round(float(lat[k]), 6)
+                fields[i]['lon'] = round(float(lon[k]), 6)
+                if own_ref[k] or use_global[k]:
+                    self.positions[hex_codes[i]] = (float(lat[k]), float(lon[k]), now)
+
+
+class ModeSStreamPoller(StreamPoller):
+    """
+    Base for raw Mode-S streams: frames are handed to a ModeSDecoder, which
+    uses receiver (lat, lon) as the reference for single-message positions.
+    """
+    def __init__(self, host, port=None, timeout=2.0, expire_seconds=60, receiver=None):
+        super().__init__(host, port, timeout, expire_seconds)
+        self.decoder = ModeSDecoder(receiver)
+
+
+class AvrStreamPoller(ModeSStreamPoller):
+    """
+    Raw Mode-S from dump1090's AVR output (port 30002): one hex frame per
+    line, '*<hex>;' or '@<timestamp><hex>;'. Each poll's frames are decoded
+    as one batch.
+    """
+    default_port = 30002
+    FRAME_PATTERN = re.compile(rb'(?:\*|@[0-9A-Fa-f]{12})([0-9A-Fa-f]{28});')
+
+    def decode(self, buffer, now):
+        end = buffer.rfind(b'\n') + 1
+        frames = self.FRAME_PATTERN.findall(buffer, 0, end)
+        if frames:
+            raw = bytes.fromhex(b''.join(frames).decode('ascii'))
+            self.decoder.decode(np.frombuffer(raw, dtype=np.uint8), now, self.table)
+        rest = buffer[end:]
+        return rest if len(rest) <= 65536 else b''
+
+
+class BeastStreamPoller(ModeSStreamPoller):
+    """
+    Raw Mode-S from dump1090's Beast binary output (port 30005).
+
+    Frames are 0x1a, a type byte ('1' Mode A/C, '2' short, '3' long
+    Mode-S, '4' receiver status), a 6-byte timestamp, a signal byte and
+    the message, with any 0x1a in the data doubled. Long frames are
+    decoded as one batch per poll; the others are skipped.
+    """
+    default_port = 30005
+    FRAME_PATTERN = re.compile(rb'\x1a([1234])((?:[^\x1a]|\x1a\x1a)*)')
+    FRAME_LENGTHS = {b'1': 9, b'2': 14, b'3': 21, b'4': 21}
+
+    def decode(self, buffer, now):
+        frames = []
+        rest = b''
+        for match in self.FRAME_PATTERN.finditer(buffer):
+            kind, data = match.groups()
+            data = data.replace(b'\x1a\x1a', b'\x1a')
+            expected = self.FRAME_LENGTHS[kind]
+            if len(data) < expected and match.end() >= len(buffer) - 1:
+                rest = buffer[match.start():] # Incomplete; finish it next poll
+                break
+            if len(data) == expected and kind == b'3':
+                frames.append(data[7:])
+        else:
+            # A trailing lone 0x1a may be the start of the next frame
+            if buffer.endswith(b'\x1a'):
+                rest = b'\x1a'
+        if frames:
+            self.decoder.decode(np.frombuffer(b''.join(frames), dtype=np.uint8), now, self.table)
+        return rest if len(rest) <= 65536 else b''
+
+
+# Streaming feeds by URL scheme, e.g. sbs://192.168.4.93:30003
+STREAM_POLLERS = {
+    'sbs': SbsStreamPoller,
+    'avr': AvrStreamPoller,
+    'beast': BeastStreamPoller,
+}
+
+
+def make_feed_poller(url, timeout=2.0, receiver=None):
+    """
+    Returns the poller for one feed URL: a stream for a known scheme, else
+    HTTP polling. receiver (lat, lon) is the reference for raw Mode-S
+    position decoding.
+    """
+    parts = urlsplit(url)
+    stream = STREAM_POLLERS.get(parts.scheme)
+    if stream is not None and issubclass(stream, ModeSStreamPoller):
+        return stream(parts.hostname, parts.port, timeout, receiver=receiver)
+    if stream is not None:
+        return stream(parts.hostname, parts.port, timeout)
+    return SnapshotPoller(url, timeout)
+
+
+class Feed:
+    """One receiver polled by MultiFeedPoller, with its latest snapshot and statistics."""
+    def __init__(self, url, timeout, receiver=None):
+        self.url = url
+        self.poller = make_feed_poller(url, timeout, receiver)
+        self.future = None          # Poll in flight, if any
+        self.data = None            # Latest snapshot
+        self.received = 0.0         # When it arrived (epoch seconds)
+        self.latency = deque(maxlen=100) # Recent HTTP times (ms)
+        self.contributed = 0        # Aircraft taken from this feed in the last merge
+        self.late = 0               # Ticks the poll was still running
+        self.errors = 0
+        self.last_error = None
+
+
+class MultiFeedPoller:
+    """
+    Polls several receivers concurrently and merges them into one snapshot.
+
+    Each tick starts a poll for every feed that isn't still busy and waits
+    at most `timeout` seconds, so a slow receiver only delays its own data:
+    its poll keeps running and is collected on a later tick. Aircraft are
+    merged by hex, keeping the report with the freshest position (the
+    feed's "now" minus seen_pos). Feeds whose last snapshot is older than
+    stale_seconds drop out of the merge.
+
+    poll() has the same interface as SnapshotPoller.poll(); the merged
+    snapshot is returned in aircraft.json form.
+    """
+    def __init__(self, urls, timeout=0.8, stale_seconds=10.0, report_seconds=60, receiver=None):
+        self.feeds = [Feed(url, timeout, receiver) for url in urls]
+        self.timeout = timeout
+        self.stale_seconds = stale_seconds
+        self.report_seconds = report_seconds
+        self.report_time = time.time()
+        self.pool = ThreadPoolExecutor(max_workers=len(self.feeds), thread_name_prefix='feed')
+
+    def poll(self):
+        """Runs one tick: returns (merged, raw_bytes, wait_ms, parse_ms), or None if no feed changed."""
+        start = time.perf_counter()
+        for feed in self.feeds:
+            if feed.future is None:
+                feed.future = self.pool.submit(feed.poller.poll)
+        wait([feed.future for feed in self.feeds], timeout=self.timeout)
+        wait_ms = (time.perf_counter() - start) * 1000
+        
+        changed = False
+        failed = 0
+        parse_ms = 0.0
+        for feed in self.feeds:
+            if not feed.future.done():
+                feed.late += 1
+                continue
+            future, feed.future = feed.future, None
+            try:
+                result = future.result()
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                feed.errors += 1
+                feed.last_error = str(e)
+                failed += 1
+                continue
+            if result is None:
+                continue # Unchanged
+            feed.data, _, http_ms, feed_parse_ms = result
+            feed.received = time.time()
+            feed.latency.append(http_ms)
+            parse_ms += feed_parse_ms
+            changed = True
+        
+        self.report_feeds()
+        if failed == len(self.feeds):
+            raise requests.exceptions.ConnectionError(
+                "All feeds failed: " + "; ".join(f"{f.url}: {f.last_error}" for f in self.feeds))
+        if not changed:
+            return None
+        
+        start = time.perf_counter()
+        merged = self.merge(time.time())
+        content = json.dumps(merged, separators=(',', ':')).encode()
+        parse_ms += (time.perf_counter() - start) * 1000
+        return merged, content, wait_ms, parse_ms
+
+    def merge(self, now):
+        """Merges the latest snapshot of every live feed by hex."""
+        best = {} # hex -> (position time, aircraft, feed)
+        snapshot_now = None
+        messages = 0
+        for feed in self.feeds:
+            feed.contributed = 0
+            if feed.data is None or now - feed.received > self.stale_seconds:
+                continue
+            feed_now = feed.data.get('now') or feed.received
+            snapshot_now = feed_now if snapshot_now is None else max(snapshot_now, feed_now)
+            messages += feed.data.get('messages') or 0
+            for ac in feed.data.get('aircraft', []):
+                hex_code = ac.get('hex')
+                if hex_code is None:
+                    continue
+                seen_pos = ac.get('seen_pos')
+                # Reports without a position rank below any with one
+                pos_time = feed_now - seen_pos if seen_pos is not None else float('-inf')
+                current = best.get(hex_code)
+                if current is None or pos_time > current[0]:
+                    best[hex_code] = (pos_time, ac, feed)
+        
+        aircraft = []
+        for _, ac, feed in best.values():
+            aircraft.append(ac)
+            feed.contributed += 1
+        return {'now': snapshot_now, 'messages': messages, 'aircraft': aircraft}
+
+    def report_feeds(self):
+        """Prints per-feed contribution and latency, at most once every report_seconds."""
+        if time.time() - self.report_time < self.report_seconds:
+            return
+        self.report_time = time.time()
+        total = sum(feed.contributed for feed in self.feeds) or 1
+        for feed in self.feeds:
+            latency = f"{np.median(feed.latency):.0f} ms" if feed.latency else "n/a"
+            print(
+                f"Feed {feed.url}: {feed.contributed} aircraft "
+                f"({100 * feed.contributed / total:.0f}%), latency {latency}, "
+                f"{feed.late} late, {feed.errors} errors"
+            )
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        for feed in self.feeds:
+            feed.poller.close()
+
+
+def make_poller(urls, timeout=2.0, feed_timeout=0.8, receiver=None):
+    """
+    Returns the poller for one URL, or a MultiFeedPoller for several.
+    With several feeds, feed_timeout bounds each feed and the whole tick.
+    """
+    if len(urls) == 1:
+        return make_feed_poller(urls[0], timeout, receiver)
+    return MultiFeedPoller(urls, feed_timeout, receiver=receiver)
+
+
+# --- Processing Core ---
+
+class AdsbCore:
+    """
+    Display-agnostic processing state.
+
+    process() normalizes each aircraft.json snapshot, computes distances
+    to the reference points (the first one is the receiver), extends the
+    track store and, if history_samples > 0, the sample history and the
+    altitude/groundspeed histograms. Tracks are either pruned to the
+    aircraft in the feed or, with keep_all_tracks, evicted by age, count
+    and memory budget.
+    """
+    def __init__(self, max_track_points, keep_all_tracks=0, track_max_age=3600,
+                 track_max_count=2000, track_memory_budget_mb=64,
+                 ref_points=None, history_samples=0):
+        self.keep_all_tracks = keep_all_tracks
+        self.track_max_age = track_max_age
+        self.track_max_count = track_max_count
+        self.track_memory_budget_mb = track_memory_budget_mb
+        
+        # Reference points for distance/bearing, receiver first
+        self.ref_lats = None
+        self.ref_lons = None
+        if ref_points:
+            self.ref_lats = np.array([p[0] for p in ref_points], dtype=float)
+            self.ref_lons = np.array([p[1] for p in ref_points], dtype=float)
+        
+        # Bounded history of distance, altitude and groundspeed samples
+        # (distances need the reference points)
+        self.history = None
+        self.alt_hist = None
+        self.gs_hist = None
+        if history_samples > 0 and self.ref_lats is not None:
+            self.history = SampleHistory(history_samples)
+            # Running histogram counts over the same samples
+            self.alt_hist = RollingHistogram(100, (0, 50000))
+            self.gs_hist = RollingHistogram(100, (0, 600)) # Set a reasonable max groundspeed
+        
+        # Latest normalized snapshot
+        self.snapshot = AircraftSnapshot.from_json({})
+        self.compute_ranges(self.snapshot)
+        # Position history for track lines
+        self.tracks = TrackStore(max_track_points)
+        # Tracks evicted in keep_all_tracks mode, by reason, and when they were last reported
+        self.track_evictions = {'age': 0, 'count': 0, 'memory': 0}
+        self.track_evictions_reported = 0
+        self.track_report_time = time.time()
+        # Snapshots processed so far
+        self.processed = 0
+
+    def compute_ranges(self, snap):
+        """Fills in the snapshot's distances and bearings to the reference points."""
+        if self.ref_lats is None:
+            return
+        # Distance and bearing to every reference point in one pass
+        distances, bearings = range_and_bearing(self.ref_lats, self.ref_lons, snap.lat, snap.lon)
+        snap.dist = distances[0] # From the receiver
+        snap.bearing = bearings[0]
+        snap.ref_dist = distances
+
+    def report_track_evictions(self):
+        """Prints track eviction statistics, at most once a minute and only if something changed."""
+        total = sum(self.track_evictions.values())
+        if total == self.track_evictions_reported or time.time() - self.track_report_time < 60:
+            return
+        self.track_evictions_reported = total
+        self.track_report_time = time.time()
+        print(
+            f"Tracks: {len(self.tracks)} kept "
+            f"({self.tracks.nbytes() / 1e6:.1f} MB), evicted "
+            f"{self.track_evictions['age']} by age, "
+            f"{self.track_evictions['count']} by count, "
+            f"{self.track_evictions['memory']} by memory"
+        )
+
+    def process(self, data):
+        """Processes one parsed aircraft.json snapshot and returns it normalized."""
+        # Parse and normalize the whole snapshot once
+        snap = AircraftSnapshot.from_json(data)
+        self.compute_ranges(snap)
+
+        # --- Track Line Logic ---
+        # Append the new positions (the store keeps the last max_track_points)
+        timestamp = snap.now if snap.now is not None else time.time()
+        self.tracks.append(snap.hex, snap.lat, snap.lon, snap.alt, timestamp)
+
+        # Update the sample history and the histogram counts
+        if self.history is not None:
+            _, old_altitudes, old_groundspeeds = self.history.extend(snap.dist, snap.alt, snap.gs)
+            self.alt_hist.add(snap.alt)
+            self.alt_hist.remove(old_altitudes)
+            self.gs_hist.add(snap.gs)
+            self.gs_hist.remove(old_groundspeeds)
+        
+        # Update the current snapshot
+        self.snapshot = snap
+        self.processed += 1
+        
+        # Conditionally prune old tracks
+        if self.keep_all_tracks == 0:
+            # Remove tracks for aircraft that are no longer in the feed
+            self.tracks.retain(snap.hex)
+        else:
+            # Persistent tracks: age out and cap stale ones
+            dropped = self.tracks.evict(
+                timestamp,
+                max_age=self.track_max_age,
+                max_count=self.track_max_count,
+                max_bytes=self.track_memory_budget_mb * 1024 * 1024,
+            )
+            for reason, count in dropped.items():
+                self.track_evictions[reason] += count
+            self.report_track_evictions()
+        
+        return snap
+
+    def summary(self):
+        """One-line status: aircraft, tracks, history and range."""
+        snap = self.snapshot
+        text = (f"Aircraft: {len(snap)}, tracks: {len(self.tracks)} "
+                f"({self.tracks.nbytes() / 1e6:.1f} MB)")
+        if self.history is not None:
+            text += f", history: {len(self.history)} samples"
+        if snap.dist is not None and len(snap):
+            text += f", max range: {np.nanmax(snap.dist):.1f} mi"
+        return text
+
+
+# --- Headless Collector ---
+
+def run_headless(core, poller, interval, recorder=None, report_seconds=60, max_polls=0):
+    """
+    Polls, records and processes snapshots without any display until
+    interrupted (or after max_polls polls), printing a summary every
+    report_seconds.
+    """
+    report_time = time.monotonic()
+    polls = 0
+    while max_polls <= 0 or polls < max_polls:
+        started = time.monotonic()
+        polls += 1
+        try:
+            result = poller.poll()
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"Error fetching data: {e}")
+            result = None
+        except ValueError as e:
+            print(f"Error decoding data: {e}")
+            result = None
+        
+        if result is not None:
+            data, content, _, _ = result
+            if recorder is not None:
+                recorder.write(content)
+            try:
+                core.process(data)
+            except Exception as e:
+                print(f"Error processing data: {e}")
+        
+        if time.monotonic() - report_time >= report_seconds:
+            report_time = time.monotonic()
+            print(core.summary())
+        
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless ADS-B collector: ingest, tracks and statistics')
+    parser.add_argument('--url', required=True, action='append',
+                        help='aircraft.json URL, sbs://host:30003, avr://host:30002 or beast://host:30005 '
+                             '(repeat for several receivers)')
+    parser.add_argument('--feed-timeout', type=float, default=0.8,
+                        help='with several feeds, the longest a poll waits for any one of them')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between polls')
+    parser.add_argument('--lat', type=float, default=None, help='receiver latitude (enables ranges)')
+    parser.add_argument('--lon', type=float, default=None, help='receiver longitude')
+    parser.add_argument('--track-points', type=int, default=10, help='points kept per track')
+    parser.add_argument('--keep-all-tracks', action='store_true',
+                        help='keep tracks of aircraft that left the feed (evicted by age/count/memory)')
+    parser.add_argument('--history', type=int, default=0,
+                        help='distance/altitude/groundspeed samples to keep (needs --lat/--lon)')
+    parser.add_argument('--record', default=None, help='directory to record snapshot logs to')
+    parser.add_argument('--report', type=float, default=60, help='seconds between status lines')
+    args = parser.parse_args(argv)
+
+    ref_points = [(args.lat, args.lon)] if args.lat is not None and args.lon is not None else None
+    core = AdsbCore(args.track_points, keep_all_tracks=int(args.keep_all_tracks),
+                    ref_points=ref_points, history_samples=args.history)
+    poller = make_poller(args.url, feed_timeout=args.feed_timeout,
+                         receiver=ref_points[0] if ref_points else None)
+    recorder = None
+    if args.record:
+        recorder = SnapshotRecorder(args.record)
+        print(f"Recording snapshots to {args.record}")
+
+    try:
+        run_headless(core, poller, args.interval, recorder, args.report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.close()
+        if recorder is not None:
+            recorder.close()
+            print(f"Recorded {recorder.written} snapshots ({recorder.dropped} dropped, {recorder.errors} failed)")
+        print(core.summary())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
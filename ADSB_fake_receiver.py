@@ -0,0 +1,446 @@
+import sys
+import json
+import socket
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from ADSB_core import cpr_nl, modes_crc, ModeSDecoder
+
+# --- Synthetic dump1090 Receiver ---
+# Serves /data/aircraft.json in dump1090-fa format for N made-up aircraft,
+# so the tracker can be driven at controlled traffic levels without a Pi:
+#
+#   python ADSB_fake_receiver.py --aircraft 1000
+#
+# then point DATA_URL at http://127.0.0.1:8504/data/aircraft.json
+#
+# With --sbs-port 30003 the same traffic is also streamed as SBS-1
+# (BaseStation) lines, for DATA_URL = "sbs://127.0.0.1:30003". Likewise
+# --avr-port 30002 and --beast-port 30005 stream raw DF17 extended
+# squitters (identification, airborne position, velocity) for avr:// and
+# beast:// URLs.
+
+AIRLINES = ['UAL', 'AAL', 'DAL', 'SWA', 'ASA', 'JBU', 'FDX', 'UPS', 'SKW', 'NKS']
+NM_PER_DEG = 60.0
+
+
+class SyntheticTraffic:
+    """
+    A population of aircraft moving around a receiver.
+
+    Each aircraft flies a slowly varying heading and climbs or descends
+    between cruise altitudes; aircraft that leave the radius are replaced
+    by new ones at the edge. A share of them sit on the ground. Per snapshot,
+    aircraft can drop out (not reported) or have fields missing, as real
+    receivers do.
+    """
+    def __init__(self, count, center_lat, center_lon, radius_nm=150.0,
+                 ground_fraction=0.03, dropout=0.02, missing=0.05, seed=None):
+        self.count = count
+        self.center_lat = center_lat
+        self.center_lon = center_lon
+        self.radius_nm = radius_nm
+        self.ground_fraction = ground_fraction
+        self.dropout = dropout
+        self.missing = missing
+        self.rng = np.random.default_rng(seed)
+
+        self.hex = [''] * count
+        self.flight = [''] * count
+        self.lat = np.zeros(count)
+        self.lon = np.zeros(count)
+        self.alt = np.zeros(count)
+        self.gs = np.zeros(count)
+        self.track = np.zeros(count)
+        self.turn_rate = np.zeros(count)  # deg/s
+        self.baro_rate = np.zeros(count)  # ft/min
+        self.on_ground = np.zeros(count, dtype=bool)
+        self.messages = 0
+        self.lock = threading.Lock() # Shared by the HTTP and SBS servers
+        self.next_hex = int(self.rng.integers(0xa00000, 0xaf0000))
+
+        self.spawn(np.arange(count), anywhere=True)
+        self.last_step = time.time()
+
+    def spawn(self, idx, anywhere=False):
+        """(Re)creates the aircraft at idx: inside the radius, or at its edge heading inwards."""
+        n = len(idx)
+        if n == 0:
+            return
+        rng = self.rng
+        bearing = rng.uniform(0, 360, n)
+        if anywhere:
+            dist = self.radius_nm * np.sqrt(rng.uniform(0, 1, n))
+            track = rng.uniform(0, 360, n)
+        else:
+            dist = np.full(n, self.radius_nm * 0.98)
+            track = (bearing + 180 + rng.uniform(-60, 60, n)) % 360
+
+        self.lat[idx] = self.center_lat + dist * np.cos(np.radians(bearing)) / NM_PER_DEG
+        self.lon[idx] = self.center_lon + dist * np.sin(np.radians(bearing)) / (
+            NM_PER_DEG * np.cos(np.radians(self.center_lat)))
+        self.track[idx] = track
+        self.turn_rate[idx] = 0
+        self.on_ground[idx] = rng.uniform(0, 1, n) < self.ground_fraction
+        self.alt[idx] = np.where(self.on_ground[idx], 0, rng.choice(
+            [3000, 8000, 12000, 18000, 24000, 31000, 35000, 37000, 39000], n))
+        self.gs[idx] = np.where(self.on_ground[idx], rng.uniform(0, 25, n),
+                                150 + self.alt[idx] / 100 + rng.uniform(-40, 40, n))
+        self.baro_rate[idx] = 0
+
+        for i in idx:
+            self.hex[i] = f'{self.next_hex:06x}'
+            self.next_hex += 1
+            self.flight[i] = f'{AIRLINES[i % len(AIRLINES)]}{rng.integers(1, 9999)}'
+
+    def step(self, now):
+        """Moves every aircraft forward to now."""
+        dt = min(max(now - self.last_step, 0), 60)
+        self.last_step = now
+        rng = self.rng
+        airborne = ~self.on_ground
+
+        # Occasionally start or stop a turn or a climb
+        change = rng.uniform(0, 1, self.count) < 0.02 * dt
+        self.turn_rate[change] = rng.choice([0, 0, -3, -1.5, 1.5, 3], change.sum())
+        change &= airborne
+        self.baro_rate[change] = rng.choice([0, 0, 0, -1500, 1500, 2500], change.sum())
+
+        self.track = (self.track + self.turn_rate * dt) % 360
+        self.alt = np.where(airborne, np.clip(self.alt + self.baro_rate * dt / 60, 1000, 45000), 0)
+        self.gs = np.where(airborne, np.clip(self.gs + rng.normal(0, 1, self.count), 120, 560),
+                           self.gs)
+
+        dist_nm = self.gs * dt / 3600
+        self.lat += dist_nm * np.cos(np.radians(self.track)) / NM_PER_DEG
+        self.lon += dist_nm * np.sin(np.radians(self.track)) / (
+            NM_PER_DEG * np.cos(np.radians(self.lat)))
+
+        # Replace aircraft that left the area
+        dy = (self.lat - self.center_lat) * NM_PER_DEG
+        dx = (self.lon - self.center_lon) * NM_PER_DEG * np.cos(np.radians(self.center_lat))
+        self.spawn(np.flatnonzero(dx * dx + dy * dy > self.radius_nm ** 2))
+
+        self.messages += int(self.count * dt * 8)
+
+    def snapshot(self, now):
+        """Returns an aircraft.json dictionary for the current state."""
+        rng = self.rng
+        reported = rng.uniform(0, 1, self.count) >= self.dropout
+        missing = rng.uniform(0, 1, (self.count, 4)) < self.missing
+        seen = rng.uniform(0, 1.5, self.count)
+
+        aircraft = []
+        for i in np.flatnonzero(reported):
+            a = {'hex': self.hex[i], 'lat': round(float(self.lat[i]), 6), 'lon': round(float(self.lon[i]), 6),
+                 'seen': round(float(seen[i]), 1), 'seen_pos': round(float(seen[i]), 1),
+                 'messages': int(self.messages // self.count), 'rssi': -20.0}
+            if not missing[i, 0]:
+                a['flight'] = f'{self.flight[i]:<8}'
+            if not missing[i, 1]:
+                a['alt_baro'] = 'ground' if self.on_ground[i] else int(round(self.alt[i], -2))
+            if not missing[i, 2]:
+                a['gs'] = round(float(self.gs[i]), 1)
+            if not missing[i, 3]:
+                a['track'] = round(float(self.track[i]), 1)
+            aircraft.append(a)
+
+        return {'now': round(now, 1), 'messages': self.messages, 'aircraft': aircraft}
+
+    def sbs_lines(self, now, dt):
+        """
+        Returns the SBS-1 MSG lines the aircraft would send over dt seconds:
+        about two positions and one velocity per second each, and a callsign
+        every ten seconds. Dropouts and missing fields apply as in snapshot().
+        """
+        rng = self.rng
+        stamp = time.strftime('%Y/%m/%d,%H:%M:%S', time.gmtime(now)) + f'.{int(now % 1 * 1000):03d}'
+        reported = rng.uniform(0, 1, self.count) >= self.dropout
+        missing = rng.uniform(0, 1, (self.count, 3)) < self.missing
+        lines = []
+
+        def line(tx, i, callsign='', alt='', gs='', track='', lat='', lon='', vrate=''):
+            ground = '-1' if self.on_ground[i] else '0'
+            lines.append(f"MSG,{tx},1,1,{self.hex[i].upper()},1,{stamp},{stamp},{callsign},{alt},"
+                         f"{gs},{track},{lat},{lon},{vrate},,0,0,0,{ground}")
+
+        for i in np.flatnonzero(reported & (rng.uniform(0, 1, self.count) < 2 * dt)):
+            if self.on_ground[i]:
+                line(2, i, gs=f'{self.gs[i]:.0f}', track=f'{self.track[i]:.0f}',
+                     lat=f'{self.lat[i]:.5f}', lon=f'{self.lon[i]:.5f}')
+            elif not missing[i, 0]:
+                line(3, i, alt=f'{round(self.alt[i], -2):.0f}', lat=f'{self.lat[i]:.5f}', lon=f'{self.lon[i]:.5f}')
+        for i in np.flatnonzero(reported & ~self.on_ground & (rng.uniform(0, 1, self.count) < dt)):
+            if not missing[i, 1]:
+                line(4, i, gs=f'{self.gs[i]:.0f}', track=f'{self.track[i]:.1f}', vrate=f'{self.baro_rate[i]:.0f}')
+        for i in np.flatnonzero(reported & (rng.uniform(0, 1, self.count) < 0.1 * dt)):
+            if not missing[i, 2]:
+                line(1, i, callsign=f'{self.flight[i]:<8}')
+        return lines
+
+
+    def modes_frames(self, now, dt):
+        """
+        Returns the DF17 extended squitters the aircraft would send over dt
+        seconds as an (n, 14) byte array, at the same rates as sbs_lines():
+        alternating even/odd airborne positions, velocities and
+        identifications. Aircraft on the ground only send identification.
+        """
+        rng = self.rng
+        reported = rng.uniform(0, 1, self.count) >= self.dropout
+        missing = rng.uniform(0, 1, (self.count, 3)) < self.missing
+        airborne = reported & ~self.on_ground
+        icao = np.array([int(h, 16) for h in self.hex], dtype=np.uint64)
+        me = []
+        
+        # Airborne position (TC 11) with barometric altitude
+        i = np.flatnonzero(airborne & ~missing[:, 0] & (rng.uniform(0, 1, self.count) < 2 * dt))
+        if len(i):
+            odd = rng.integers(0, 2, len(i))
+            n = np.clip(np.round((self.alt[i] + 1000) / 25), 0, 2047).astype(np.int64)
+            alt12 = ((n >> 4) << 5) | 16 | (n & 15)
+            dlat = 360 / (60 - odd)
+            lat_cpr = np.floor(131072 * np.mod(self.lat[i], dlat) / dlat + 0.5)
+            rlat = dlat * (lat_cpr / 131072 + np.floor(self.lat[i] / dlat))
+            dlon = 360 / np.maximum(cpr_nl(rlat) - odd, 1)
+            lon_cpr = np.floor(131072 * np.mod(self.lon[i], dlon) / dlon + 0.5)
+            word = ((11 << 51) | (alt12 << 36) | (odd << 34)
+                    | (lat_cpr.astype(np.int64) % 131072 << 17) | (lon_cpr.astype(np.int64) % 131072))
+            me.append((i, word))
+        
+        # Airborne velocity over ground (TC 19, subtype 1)
+        i = np.flatnonzero(airborne & ~missing[:, 1] & (rng.uniform(0, 1, self.count) < dt))
+        if len(i):
+            vx = np.round(self.gs[i] * np.sin(np.radians(self.track[i]))).astype(np.int64)
+            vy = np.round(self.gs[i] * np.cos(np.radians(self.track[i]))).astype(np.int64)
+            vr = np.round(np.abs(self.baro_rate[i]) / 64).astype(np.int64) + 1
+            word = ((19 << 51) | (1 << 48) | ((vx < 0).astype(np.int64) << 42)
+                    | (np.minimum(np.abs(vx) + 1, 1023) << 32) | ((vy < 0).astype(np.int64) << 31)
+                    | (np.minimum(np.abs(vy) + 1, 1023) << 21)
+                    | ((self.baro_rate[i] < 0).astype(np.int64) << 19) | (np.minimum(vr, 511) << 10))
+            me.append((i, word))
+        
+        # Identification (TC 4)
+        i = np.flatnonzero(reported & ~missing[:, 2] & (rng.uniform(0, 1, self.count) < 0.1 * dt))
+        if len(i):
+            word = np.zeros(len(i), dtype=np.int64)
+            for k, idx in enumerate(i):
+                value = 4 << 3 # TC 4, category 0
+                for c in f'{self.flight[idx]:<8}'[:8]:
+                    value = (value << 6) | ModeSDecoder.CHARSET.index(c)
+                word[k] = value
+            me.append((i, word))
+        
+        if not me:
+            return np.zeros((0, 14), dtype=np.uint8)
+        idx = np.concatenate([m[0] for m in me])
+        word = np.concatenate([m[1] for m in me]).astype(np.uint64)
+        order = rng.permutation(len(idx))
+        idx, word = idx[order], word[order]
+        
+        frames = np.zeros((len(idx), 14), dtype=np.uint8)
+        frames[:, 0] = (17 << 3) | 5
+        for k in range(3):
+            frames[:, 1 + k] = (icao[idx] >> np.uint64(16 - 8 * k)) & np.uint64(0xFF)
+        for k in range(7):
+            frames[:, 4 + k] = (word >> np.uint64(48 - 8 * k)) & np.uint64(0xFF)
+        crc = modes_crc(frames)
+        frames[:, 11] = crc >> 16
+        frames[:, 12] = (crc >> 8) & 0xFF
+        frames[:, 13] = crc & 0xFF
+        return frames
+
+
+class FakeReceiver:
+    """
+    Serves a SyntheticTraffic population over HTTP like dump1090-fa.
+
+    The snapshot is rebuilt at most once per interval and carries an ETag,
+    so conditional requests get 304 Not Modified in between.
+    """
+    def __init__(self, traffic, host='127.0.0.1', port=8504, interval=1.0):
+        self.traffic = traffic
+        self.interval = interval
+        self.lock = traffic.lock
+        self.body = b''
+        self.etag = None
+        self.built = 0
+
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0].rstrip('/') not in ('/data/aircraft.json', '/aircraft.json'):
+                    self.send_error(404)
+                    return
+                body, etag = receiver.current()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    def current(self):
+        """Returns (body, etag), rebuilding the snapshot if it is older than interval."""
+        with self.lock:
+            now = time.time()
+            if now - self.built >= self.interval:
+                self.traffic.step(now)
+                self.body = json.dumps(self.traffic.snapshot(now), separators=(',', ':')).encode()
+                self.etag = f'"{int(now * 10):x}"'
+                self.built = now
+            return self.body, self.etag
+
+    def start(self):
+        """Serves in a background thread."""
+        self.thread = threading.Thread(target=self.server.serve_forever, name='FakeReceiver', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSbsFeed:
+    """
+    Streams a SyntheticTraffic population as SBS-1 (BaseStation) lines over
+    TCP, like dump1090's port 30003, to every connected client.
+    """
+    name = 'FakeSbs'
+
+    def __init__(self, traffic, host='127.0.0.1', port=30003, tick=0.1):
+        self.traffic = traffic
+        self.tick = tick
+        self.clients = []
+        self.server = socket.create_server((host, port))
+        self.running = False
+
+    def start(self):
+        """Accepts clients and streams in background threads."""
+        self.running = True
+        threading.Thread(target=self._accept, name=self.name + 'Accept', daemon=True).start()
+        threading.Thread(target=self._stream, name=self.name + 'Stream', daemon=True).start()
+
+    def _accept(self):
+        while self.running:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                break
+            self.clients.append(client)
+
+    def _stream(self):
+        last = time.time()
+        while self.running:
+            time.sleep(self.tick)
+            now = time.time()
+            with self.traffic.lock:
+                self.traffic.step(now)
+                data = self.encode(now, now - last)
+            last = now
+            for client in list(self.clients):
+                try:
+                    client.sendall(data)
+                except OSError:
+                    self.clients.remove(client)
+                    client.close()
+
+    def encode(self, now, dt):
+        """Returns the bytes to send for the last dt seconds of traffic."""
+        return ''.join(line + '\r\n' for line in self.traffic.sbs_lines(now, dt)).encode()
+
+    def stop(self):
+        self.running = False
+        self.server.close()
+        for client in self.clients:
+            client.close()
+
+
+class FakeAvrFeed(FakeSbsFeed):
+    """Streams raw DF17 frames as AVR hex lines ('*<hex>;'), like dump1090's port 30002."""
+    name = 'FakeAvr'
+
+    def __init__(self, traffic, host='127.0.0.1', port=30002, tick=0.1):
+        super().__init__(traffic, host, port, tick)
+
+    def encode(self, now, dt):
+        frames = self.traffic.modes_frames(now, dt)
+        return b''.join(b'*' + frame.tobytes().hex().upper().encode() + b';\n' for frame in frames)
+
+
+class FakeBeastFeed(FakeSbsFeed):
+    """Streams raw DF17 frames in Beast binary format, like dump1090's port 30005."""
+    name = 'FakeBeast'
+
+    def __init__(self, traffic, host='127.0.0.1', port=30005, tick=0.1):
+        super().__init__(traffic, host, port, tick)
+
+    def encode(self, now, dt):
+        frames = self.traffic.modes_frames(now, dt)
+        stamp = int(now * 12e6) % (1 << 48) # 12 MHz counter
+        header = stamp.to_bytes(6, 'big') + b'\x80' # Signal level
+        return b''.join(
+            b'\x1a3' + (header + frame.tobytes()).replace(b'\x1a', b'\x1a\x1a') for frame in frames
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve synthetic dump1090-fa aircraft.json')
+    parser.add_argument('--aircraft', type=int, default=100, help='number of aircraft (10 to 5000)')
+    parser.add_argument('--lat', type=float, default=37.9555, help='receiver latitude')
+    parser.add_argument('--lon', type=float, default=-121.6978, help='receiver longitude')
+    parser.add_argument('--radius', type=float, default=150.0, help='coverage radius (nm)')
+    parser.add_argument('--ground', type=float, default=0.03, help="fraction of aircraft on the 'ground'")
+    parser.add_argument('--dropout', type=float, default=0.02, help='chance an aircraft is missing from a snapshot')
+    parser.add_argument('--missing', type=float, default=0.05, help='chance each optional field is missing')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between snapshot updates')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8504)
+    parser.add_argument('--sbs-port', type=int, default=None, help='also stream SBS-1 lines on this port (e.g. 30003)')
+    parser.add_argument('--avr-port', type=int, default=None, help='also stream AVR raw frames on this port (e.g. 30002)')
+    parser.add_argument('--beast-port', type=int, default=None, help='also stream Beast raw frames on this port (e.g. 30005)')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    traffic = SyntheticTraffic(args.aircraft, args.lat, args.lon, args.radius,
+                               args.ground, args.dropout, args.missing, args.seed)
+    receiver = FakeReceiver(traffic, args.host, args.port, args.interval)
+    print(f"Serving {args.aircraft} aircraft at http://{args.host}:{args.port}/data/aircraft.json")
+    if args.sbs_port:
+        sbs = FakeSbsFeed(traffic, args.host, args.sbs_port)
+        sbs.start()
+        print(f"Streaming SBS-1 at sbs://{args.host}:{args.sbs_port}")
+    if args.avr_port:
+        avr = FakeAvrFeed(traffic, args.host, args.avr_port)
+        avr.start()
+        print(f"Streaming AVR at avr://{args.host}:{args.avr_port}")
+    if args.beast_port:
+        beast = FakeBeastFeed(traffic, args.host, args.beast_port)
+        beast.start()
+        print(f"Streaming Beast at beast://{args.host}:{args.beast_port}")
+    try:
+        receiver.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
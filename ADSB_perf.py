@@ -0,0 +1,82 @@
+import os
+import csv
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class StageTimer:
+    """
+    Rolling per-stage timings for the update loop.
+
+    Each stage keeps its last `window` durations (ms) in a ring buffer, so
+    percentiles reflect recent behaviour only. Optionally every frame is
+    appended to a CSV file as one row with a column per stage.
+    """
+    def __init__(self, stages, window=300, csv_path=None):
+        self.stages = list(stages)
+        self.window = window
+        self.samples = {stage: np.full(window, np.nan) for stage in self.stages}
+        self.counts = {stage: 0 for stage in self.stages}
+        self.frame = {}
+
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path:
+            new_file = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+            self.csv_file = open(csv_path, 'a', newline='')
+            self.csv_writer = csv.writer(self.csv_file)
+            if new_file:
+                self.csv_writer.writerow(['time'] + self.stages)
+
+    def add(self, stage, ms):
+        """Records one duration (ms) for stage in the current frame."""
+        if stage not in self.samples:
+            return # Unknown stages are ignored rather than breaking the CSV layout
+        self.samples[stage][self.counts[stage] % self.window] = ms
+        self.counts[stage] += 1
+        self.frame[stage] = self.frame.get(stage, 0.0) + ms
+
+    @contextmanager
+    def time(self, stage):
+        """Times the body of a with-block as stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def end_frame(self):
+        """Closes the current frame and writes it to the CSV file, if any."""
+        if self.csv_writer is not None and self.frame:
+            self.csv_writer.writerow(
+                [f"{time.time():.3f}"]
+                + [f"{self.frame[stage]:.3f}" if stage in self.frame else '' for stage in self.stages]
+            )
+            self.csv_file.flush()
+        self.frame = {}
+
+    def percentiles(self, stage, q=(50, 95)):
+        """Returns the rolling percentiles (ms) for stage, or None if it has no samples."""
+        filled = self.samples[stage][:min(self.counts[stage], self.window)]
+        if not len(filled):
+            return None
+        return np.percentile(filled, q)
+
+    def summary(self):
+        """Returns a short text table: one 'stage  p50 / p95 ms' line per timed stage."""
+        lines = []
+        for stage in self.stages:
+            p = self.percentiles(stage)
+            if p is not None:
+                lines.append(f"{stage:<12}{p[0]:7.1f} /{p[1]:7.1f}")
+        if lines:
+            lines.insert(0, f"{'ms':<12}{'p50':>7} /{'p95':>7}")
+        return '\n'.join(lines)
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
@@ -0,0 +1,457 @@
+import math
+from html import escape
+
+import numpy as np
+from PyQt5.QtCore import Qt, QPointF, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter, QPainterPath, QPen, QPolygonF, QTransform
+from PyQt5.QtWidgets import (
+    QFrame, QGraphicsEllipseItem, QGraphicsItem, QGraphicsPathItem, QGraphicsPolygonItem,
+    QGraphicsRectItem, QGraphicsScene, QGraphicsSimpleTextItem, QGraphicsView, QLabel, QToolTip,
+)
+
+from ADSB_core import mercator_pixels
+
+# --- Native Radar Scope ---
+# Draws the radar-only map with QGraphicsView instead of a browser page.
+# Scene coordinates are Web Mercator pixels at zoom 0 (the world is
+# WORLD_PX units wide) and the view is scaled by 2**zoom, so visible
+# bounds, zoom levels and the clustering / label math in the tracker are
+# the same as on the Leaflet page.
+#
+# Every aircraft marker, label, trail and cluster is a persistent item:
+# an update moves or re-texts the items already in the scene, and the
+# items of aircraft that leave are hidden and kept for reuse.
+
+WORLD_PX = 256
+EARTH_CIRCUMFERENCE_M = 40075016.686
+MIN_ZOOM = 4
+MAX_ZOOM = 18
+
+# Stacking order, bottom to top (as the layers on the Leaflet page)
+Z_BASE, Z_AIRPORT, Z_TRACK, Z_AIRCRAFT, Z_CLUSTER = range(5)
+
+AIRCRAFT_COLOR = '#00FF00'
+LABEL_FONT = 'Arial'
+
+
+def scene_xy(lats, lons):
+    """Scene coordinates (x, y arrays) of points."""
+    return mercator_pixels(lats, lons, 0)
+
+
+def scene_lat_lon(point):
+    """Inverse of scene_xy for one scene point: (lat, lon)."""
+    lon = point.x() / WORLD_PX * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * point.y() / WORLD_PX))))
+    return lat, lon
+
+
+def polyline_path(x, y):
+    """A QPainterPath through the points (x[i], y[i])."""
+    path = QPainterPath()
+    path.addPolygon(QPolygonF([QPointF(px, py) for px, py in zip(x.tolist(), y.tolist())]))
+    return path
+
+
+def cosmetic_pen(color, width=1.0, opacity=1.0, dash=None):
+    """A pen whose width (and dash, in pixels like a Leaflet dashArray) ignores the zoom."""
+    color = QColor(color)
+    color.setAlphaF(opacity)
+    pen = QPen(color, width)
+    pen.setCosmetic(True)
+    if dash:
+        # Qt dash lengths are in pen widths
+        pen.setDashPattern([d / max(width, 1.0) for d in dash])
+    return pen
+
+
+class ScopeLabel(QGraphicsSimpleTextItem):
+    """Pixel-sized text, optionally on a rounded background box."""
+    def __init__(self, text='', color=AIRCRAFT_COLOR, size=9, weight=QFont.Medium,
+                 background=None, opacity=1.0, parent=None):
+        super().__init__(text, parent)
+        self.setFont(QFont(LABEL_FONT, size, weight))
+        color = QColor(color)
+        color.setAlphaF(opacity)
+        self.setBrush(color)
+        self.background = QColor(background) if background is not None else None
+        self.setAcceptedMouseButtons(Qt.NoButton)
+
+    def boundingRect(self):
+        rect = super().boundingRect()
+        return rect.adjusted(-4, -2, 4, 2) if self.background is not None else rect
+
+    def paint(self, painter, option, widget=None):
+        if self.background is not None:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self.background)
+            painter.drawRoundedRect(self.boundingRect(), 3, 3)
+        super().paint(painter, option, widget)
+
+
+class AircraftMarker(QGraphicsEllipseItem):
+    """Aircraft circle with its two-line label as a child item; clicking shows the details."""
+    HIT_RADIUS = 8 # px, so the small circle is easy to tap on a touch screen
+
+    def __init__(self):
+        super().__init__(-3, -3, 6, 6)
+        self.setFlag(QGraphicsItem.ItemIgnoresTransformations)
+        self.setPen(QPen(QColor(AIRCRAFT_COLOR), 1.5))
+        self.setZValue(Z_AIRCRAFT)
+        self.label = ScopeLabel(parent=self)
+        self.label.setPos(10, -7)
+        self.labeled = True
+
+    def boundingRect(self):
+        r = self.HIT_RADIUS
+        return super().boundingRect().united(self.rect().adjusted(-r, -r, r, r))
+
+    def shape(self):
+        path = QPainterPath()
+        path.addEllipse(QPointF(0, 0), self.HIT_RADIUS, self.HIT_RADIUS)
+        return path
+
+    def set_row(self, row, show_labels):
+        """Updates the label and details from a patch row [hex, lat, lon, flight, alt, alt_gs, labeled]."""
+        hex_code, _, _, flight, alt, alt_gs, labeled = row
+        self.setToolTip(f"<b>Flight: {escape(flight)}</b><br>Altitude: {alt} ft<br>Hex: {escape(hex_code.upper())}")
+        text = f"{flight}\n{alt_gs}"
+        if self.label.text() != text:
+            self.label.setText(text)
+        self.labeled = labeled
+        self.label.setVisible(labeled and show_labels)
+
+    def mousePressEvent(self, event):
+        QToolTip.showText(event.screenPos(), self.toolTip())
+
+
+class ClusterMarker(QGraphicsEllipseItem):
+    """Circle with an aircraft count; clicking zooms the scope in on it."""
+    def __init__(self, scope):
+        super().__init__()
+        self.scope = scope
+        self.count = None
+        self.setFlag(QGraphicsItem.ItemIgnoresTransformations)
+        self.setPen(QPen(QColor(AIRCRAFT_COLOR), 1.5))
+        self.setBrush(QColor(0, 0, 0, 178))
+        self.setZValue(Z_CLUSTER)
+        self.text = ScopeLabel(parent=self)
+
+    def set_count(self, count):
+        if count == self.count:
+            return
+        size = 24 if count < 10 else (30 if count < 100 else 36)
+        self.setRect(-size / 2, -size / 2, size, size)
+        self.text.setText(str(count))
+        rect = self.text.boundingRect()
+        self.text.setPos(-rect.width() / 2, -rect.height() / 2)
+        self.count = count
+
+    def mousePressEvent(self, event):
+        self.scope.zoom_to(self.pos(), self.scope.zoom + 2)
+
+
+class RadarScope(QGraphicsView):
+    """
+    Native map view for the radar-only build.
+
+    Static decoration (outlines, rings, airspace, receiver) is added once
+    through the add_* methods. Aircraft, trails, clusters and airports
+    come in through apply_patch(), which takes the same patch dict that
+    update_map() sends to the Leaflet page. After every pan or zoom the
+    visible bounds and zoom are reported through view_changed.
+    """
+    # (south, west, north, east, zoom)
+    view_changed = pyqtSignal(float, float, float, float, float)
+
+    def __init__(self, center, zoom, track_style, show_labels=True, parent=None):
+        super().__init__(parent)
+        scene = QGraphicsScene(0, 0, WORLD_PX, WORLD_PX, self)
+        # Most items move on every update, so a BSP index would only be rebuilt
+        scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.setScene(scene)
+        self.setBackgroundBrush(QColor('#000000'))
+        self.setFrameShape(QFrame.NoFrame)
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        # Zoom anchoring is done by zoom_to(); resizing keeps the center
+        self.setTransformationAnchor(QGraphicsView.NoAnchor)
+        self.setResizeAnchor(QGraphicsView.AnchorViewCenter)
+
+        dash = track_style.get('dashArray')
+        self.track_pen = cosmetic_pen(
+            track_style['color'], track_style['weight'], track_style.get('opacity', 1),
+            [float(d) for d in dash.split(',')] if dash else None,
+        )
+        self.show_labels = show_labels
+        self.zoom = None
+
+        self.base_items = []
+        # Items on the scope by key, and hidden items kept for reuse
+        self.aircraft, self.spare_aircraft = {}, []
+        self.tracks, self.spare_tracks = {}, []
+        self.clusters, self.spare_clusters = {}, []
+        self.airports = {} # Created once per airport, hidden while out of view
+
+        # Aircraft count and stage timings, over the bottom-left corner
+        self.count_label = QLabel("Aircraft: 0", self)
+        self.count_label.setStyleSheet(
+            "font-family: Arial, sans-serif; font-size: 12pt; color: green; "
+            "background-color: black; padding: 5px 10px; border-radius: 5px;"
+        )
+        self.perf_label = QLabel(self)
+        self.perf_label.setStyleSheet(
+            "font-family: monospace; font-size: 9pt; color: green; "
+            "background-color: rgba(0, 0, 0, 0.8); padding: 5px 10px; border-radius: 5px;"
+        )
+        self.perf_label.hide()
+
+        # Views are reported once panning or zooming settles, like Leaflet's moveend
+        self.report_timer = QTimer(self)
+        self.report_timer.setSingleShot(True)
+        self.report_timer.setInterval(100)
+        self.report_timer.timeout.connect(self.report_view)
+
+        self.set_zoom(zoom)
+        x, y = scene_xy(center[0], center[1])
+        self.centerOn(float(x), float(y))
+
+    # --- Static base layer ---
+
+    def clear_base_layer(self):
+        """Removes everything added with the add_* methods."""
+        for item in self.base_items:
+            self.scene().removeItem(item)
+        self.base_items = []
+
+    def add_base_item(self, item, tooltip=None):
+        item.setZValue(Z_BASE)
+        if tooltip:
+            item.setToolTip(tooltip)
+        self.scene().addItem(item)
+        self.base_items.append(item)
+        return item
+
+    def add_outlines(self, geojson, color, width=1.0):
+        """Adds the outlines of every Polygon / MultiPolygon in a GeoJSON FeatureCollection as one path."""
+        path = QPainterPath()
+        for feature in geojson.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') == 'Polygon':
+                polygons = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                polygons = geometry['coordinates']
+            else:
+                continue
+            for polygon in polygons:
+                for ring in polygon:
+                    points = np.asarray(ring, dtype=float)
+                    if len(points) >= 2:
+                        path.addPath(polyline_path(*scene_xy(points[:, 1], points[:, 0])))
+        item = QGraphicsPathItem(path)
+        item.setPen(cosmetic_pen(color, width))
+        item.setAcceptedMouseButtons(Qt.NoButton)
+        return self.add_base_item(item)
+
+    def add_circle(self, lat, lon, radius_m, color, width=1.0, opacity=1.0, dash=None, tooltip=None):
+        """Adds a circle of radius_m meters (scaled for latitude, as Leaflet draws one)."""
+        x, y = scene_xy(lat, lon)
+        r = radius_m / (EARTH_CIRCUMFERENCE_M * math.cos(math.radians(lat))) * WORLD_PX
+        item = QGraphicsEllipseItem(float(x) - r, float(y) - r, 2 * r, 2 * r)
+        item.setPen(cosmetic_pen(color, width, opacity, dash))
+        item.setAcceptedMouseButtons(Qt.NoButton)
+        return self.add_base_item(item, tooltip)
+
+    def add_text(self, lat, lon, text, color, size=8, opacity=1.0, background=None):
+        """Adds a bold label centered on a point."""
+        item = ScopeLabel(text, color, size, QFont.Bold, background, opacity)
+        item.setFlag(QGraphicsItem.ItemIgnoresTransformations)
+        rect = item.boundingRect()
+        item.setTransform(QTransform.fromTranslate(-rect.center().x(), -rect.center().y()))
+        x, y = scene_xy(lat, lon)
+        item.setPos(float(x), float(y))
+        return self.add_base_item(item)
+
+    def add_receiver(self, lat, lon, tooltip=None):
+        """Adds the receiver marker: a point-up triangle."""
+        r = 8
+        triangle = QPolygonF([
+            QPointF(r * math.cos(math.radians(a)), -r * math.sin(math.radians(a))) for a in (90, 210, 330)
+        ])
+        item = QGraphicsPolygonItem(triangle)
+        item.setFlag(QGraphicsItem.ItemIgnoresTransformations)
+        item.setPen(QPen(QColor('#FFFFFF'), 1))
+        item.setBrush(QColor('#000000'))
+        x, y = scene_xy(lat, lon)
+        item.setPos(float(x), float(y))
+        return self.add_base_item(item, tooltip)
+
+    # --- Dynamic content ---
+
+    def new_airport(self, code, color):
+        item = QGraphicsRectItem(-4, -4, 8, 8)
+        item.setFlag(QGraphicsItem.ItemIgnoresTransformations)
+        item.setPen(QPen(QColor(color), 2))
+        item.setBrush(QColor(color))
+        item.setZValue(Z_AIRPORT)
+        item.setToolTip(escape(code))
+        label = ScopeLabel(code, color, parent=item)
+        label.setPos(10, -7)
+        self.scene().addItem(item)
+        return item
+
+    def apply_patch(self, patch):
+        """Applies an update_map() patch: moves, re-texts, shows or hides the persistent items."""
+        self.count_label.setText(f"Aircraft: {patch['count']}")
+        self.count_label.adjustSize()
+
+        # 1. Aircraft markers and their labels
+        for hex_code in patch['remove']:
+            marker = self.aircraft.pop(hex_code, None)
+            if marker is not None:
+                marker.hide()
+                self.spare_aircraft.append(marker)
+        rows = patch['aircraft']
+        if rows:
+            x, y = scene_xy([row[1] for row in rows], [row[2] for row in rows])
+            for row, px, py in zip(rows, x.tolist(), y.tolist()):
+                marker = self.aircraft.get(row[0])
+                if marker is None:
+                    if self.spare_aircraft:
+                        marker = self.spare_aircraft.pop()
+                        marker.show()
+                    else:
+                        marker = AircraftMarker()
+                        self.scene().addItem(marker)
+                    self.aircraft[row[0]] = marker
+                marker.setPos(px, py)
+                marker.set_row(row, self.show_labels)
+
+        # 2. Trails
+        for hex_code in patch['drop_tracks']:
+            item = self.tracks.pop(hex_code, None)
+            if item is not None:
+                item.hide()
+                self.spare_tracks.append(item)
+        tracks = patch['tracks']
+        if tracks:
+            # Project every trail point in one batch, then split per trail
+            points = np.concatenate([np.asarray(pts, dtype=float) for pts in tracks.values()])
+            x, y = scene_xy(points[:, 0], points[:, 1])
+            ends = np.cumsum([len(pts) for pts in tracks.values()]).tolist()
+        for n, hex_code in enumerate(tracks):
+            item = self.tracks.get(hex_code)
+            if item is None:
+                if self.spare_tracks:
+                    item = self.spare_tracks.pop()
+                    item.show()
+                else:
+                    item = QGraphicsPathItem()
+                    item.setPen(self.track_pen)
+                    item.setZValue(Z_TRACK)
+                    item.setAcceptedMouseButtons(Qt.NoButton)
+                    self.scene().addItem(item)
+                self.tracks[hex_code] = item
+            start = ends[n - 1] if n else 0
+            item.setPath(polyline_path(x[start:ends[n]], y[start:ends[n]]))
+
+        # 3. Cluster markers
+        for key in patch['drop_clusters']:
+            item = self.clusters.pop(key, None)
+            if item is not None:
+                item.hide()
+                self.spare_clusters.append(item)
+        for key, lat, lon, count in patch['clusters']:
+            item = self.clusters.get(key)
+            if item is None:
+                if self.spare_clusters:
+                    item = self.spare_clusters.pop()
+                    item.show()
+                else:
+                    item = ClusterMarker(self)
+                    self.scene().addItem(item)
+                self.clusters[key] = item
+            x, y = scene_xy(lat, lon)
+            item.setPos(float(x), float(y))
+            item.set_count(count)
+
+        # 4. Airports
+        for code in patch['drop_airports']:
+            if code in self.airports:
+                self.airports[code].hide()
+        for code, lat, lon, color in patch['airports']:
+            item = self.airports.get(code)
+            if item is None:
+                item = self.airports[code] = self.new_airport(code, color)
+                x, y = scene_xy(lat, lon)
+                item.setPos(float(x), float(y))
+            item.show()
+
+    def reset(self):
+        """Hides every aircraft, trail, cluster and airport (the next patch resends them)."""
+        self.apply_patch({
+            'count': 0, 'aircraft': [], 'remove': list(self.aircraft),
+            'tracks': {}, 'drop_tracks': list(self.tracks),
+            'clusters': [], 'drop_clusters': list(self.clusters),
+            'airports': [], 'drop_airports': list(self.airports),
+        })
+
+    def set_labels(self, show):
+        """Shows or hides the aircraft labels (those kept by the declutter pass)."""
+        self.show_labels = show
+        for marker in self.aircraft.values():
+            marker.label.setVisible(show and marker.labeled)
+
+    def set_perf(self, text):
+        """Shows the stage timings overlay; hidden while text is empty."""
+        self.perf_label.setText(text)
+        self.perf_label.adjustSize()
+        self.perf_label.setVisible(bool(text))
+        self.place_overlays()
+
+    # --- Pan and zoom ---
+
+    def set_zoom(self, zoom):
+        """Sets the zoom level (Leaflet's scale: 2**zoom pixels per scene unit), keeping the center."""
+        self.zoom_to(self.mapToScene(self.viewport().rect().center()), zoom)
+
+    def zoom_to(self, center, zoom):
+        """Zooms to zoom, with the scene point center in the middle of the view."""
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, zoom))
+        scale = 2.0 ** self.zoom
+        self.setTransform(QTransform.fromScale(scale, scale))
+        self.centerOn(center)
+        self.report_timer.start()
+
+    def wheelEvent(self, event):
+        # Half a zoom level per wheel step, keeping the point under the mouse in place
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return
+        anchor = self.mapToScene(event.pos())
+        middle = self.mapToScene(self.viewport().rect().center())
+        ratio = 2.0 ** -(min(MAX_ZOOM, max(MIN_ZOOM, self.zoom + 0.5 * steps)) - self.zoom)
+        self.zoom_to(anchor + (middle - anchor) * ratio, self.zoom + 0.5 * steps)
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.report_timer.start()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.place_overlays()
+        self.report_timer.start()
+
+    def place_overlays(self):
+        bottom = self.height() - 10
+        self.count_label.move(10, bottom - self.count_label.height())
+        self.perf_label.move(160, bottom - self.perf_label.height())
+
+    def report_view(self):
+        """Emits view_changed with the visible bounds and zoom."""
+        rect = self.mapToScene(self.viewport().rect()).boundingRect()
+        north, west = scene_lat_lon(rect.topLeft())
+        south, east = scene_lat_lon(rect.bottomRight())
+        self.view_changed.emit(round(south, 4), round(west, 4), round(north, 4), round(east, 4), self.zoom)
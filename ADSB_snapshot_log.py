@@ -0,0 +1,201 @@
+import os
+import re
+import time
+import zlib
+import queue
+import struct
+import threading
+
+# --- Snapshot Log Format ---
+# A log file starts with MAGIC, followed by one record per snapshot:
+#   RECORD_HEADER: receive time (float64, epoch seconds), payload length (uint32)
+#   payload:       zlib-compressed raw aircraft.json bytes
+# Records are self-contained, so a log cut short by a crash is still
+# readable up to its last complete record.
+MAGIC = b'ADSBLOG1'
+RECORD_HEADER = struct.Struct('<dI')
+LOG_SUFFIX = '.adsblog'
+
+# dump1090 writes "now" at the top of aircraft.json
+NOW_PATTERN = re.compile(rb'"now"\s*:\s*([0-9.]+)')
+
+
+class SnapshotRecorder:
+    """
+    Appends raw aircraft.json snapshots to compressed, length-prefixed
+    log files on a background writer thread.
+
+    write() only queues the bytes and never blocks the poll loop; if the
+    writer falls behind and the queue fills up, snapshots are dropped and
+    counted. Files are rotated by size or age, and fsync is batched: at
+    most fsync_seconds of records are ever unsynced. A failed write (e.g.
+    a full disk) is counted and the next snapshot starts a new file.
+    """
+    def __init__(self, directory, rotate_bytes=64 * 1024 * 1024, rotate_seconds=3600,
+                 fsync_seconds=5.0, compress_level=6, queue_size=256):
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync_seconds = fsync_seconds
+        self.compress_level = compress_level
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0   # Snapshots lost because the queue was full
+        self.written = 0   # Snapshots written to disk
+        self.errors = 0    # Snapshots lost to write errors
+        self.last_error = None
+
+        self.file = None
+        self.file_path = None
+        self.file_opened = 0
+        self.last_fsync = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name='SnapshotRecorder', daemon=True)
+        self.thread.start()
+
+    def write(self, payload, received=None):
+        """Queues one raw snapshot. Never blocks."""
+        try:
+            self.queue.put_nowait((time.time() if received is None else received, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=10.0):
+        """Writes everything still queued, then closes the current file. Gives up after timeout seconds."""
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("Warning: Snapshot recorder is not draining its queue; closing without it.")
+            return
+        self.thread.join(timeout)
+
+    def _open_file(self, now):
+        self._close_file()
+        stamp = time.strftime('adsb-%Y%m%d-%H%M%S', time.localtime(now))
+        # Several files in one second (fast rotation) get a sequence
+        # number, which sorts after the plain name
+        sequence = 0
+        self.file_path = os.path.join(self.directory, stamp + LOG_SUFFIX)
+        while os.path.exists(self.file_path):
+            sequence += 1
+            self.file_path = os.path.join(self.directory, f'{stamp}_{sequence:03d}{LOG_SUFFIX}')
+        self.file = open(self.file_path, 'wb')
+        self.file.write(MAGIC)
+        self.file_opened = now
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+    def _run(self):
+        """Writer thread: compress, append, rotate and fsync."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except (OSError, ValueError, zlib.error) as e:
+                self.errors += 1
+                if str(e) != self.last_error:
+                    print(f"Warning: Could not write snapshot log: {e}")
+                self.last_error = str(e)
+                self._abandon_file()
+
+        try:
+            self._close_file()
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not close snapshot log: {e}")
+
+    def _write(self, received, payload):
+        # Rotate by size or age
+        if (self.file is None
+                or self.file.tell() >= self.rotate_bytes
+                or received - self.file_opened >= self.rotate_seconds):
+            self._open_file(received)
+
+        data = zlib.compress(payload, self.compress_level)
+        self.file.write(RECORD_HEADER.pack(received, len(data)))
+        self.file.write(data)
+        self.written += 1
+
+        # Batch fsyncs: at most one per fsync_seconds, however busy the queue is
+        now = time.time()
+        if now - self.last_fsync >= self.fsync_seconds:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+
+    def _abandon_file(self):
+        """Drops the current file after a write error; the next snapshot opens a new one."""
+        if self.file is not None:
+            try:
+                self.file.close()
+            except (OSError, ValueError):
+                pass
+            self.file = None
+
+
+def log_files(path):
+    """Returns the log files at path (a single file, or a directory of logs in time order)."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(LOG_SUFFIX)
+        )
+    return [path]
+
+
+def read_snapshot_log(path):
+    """
+    Yields (receive_time, raw_bytes) for every snapshot in a log file or
+    a directory of log files. A truncated final record is skipped.
+    """
+    for file_path in log_files(path):
+        with open(file_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{file_path} is not a snapshot log")
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                received, length = RECORD_HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    break # Cut short by a crash
+                yield received, zlib.decompress(data)
+
+
+def read_json_dir(path):
+    """
+    Yields (time, raw_bytes) for a folder of aircraft.json files, in the
+    order of their "now" stamps (file modification time if missing).
+    """
+    frames = []
+    for name in os.listdir(path):
+        if not name.endswith('.json'):
+            continue
+        file_path = os.path.join(path, name)
+        with open(file_path, 'rb') as f:
+            match = NOW_PATTERN.search(f.read(256))
+        stamp = float(match.group(1)) if match else os.path.getmtime(file_path)
+        frames.append((stamp, file_path))
+
+    for stamp, file_path in sorted(frames):
+        with open(file_path, 'rb') as f:
+            yield stamp, f.read()
+
+
+def read_recording(path):
+    """
+    Yields (time, raw_bytes) from any recording: a snapshot log, a folder
+    of snapshot logs, or a folder of aircraft.json files.
+    """
+    if os.path.isdir(path) and not log_files(path):
+        return read_json_dir(path)
+    return read_snapshot_log(path)
@@ -0,0 +1,156 @@
+import math
+
+import numpy as np
+import pytest
+
+from ADSB_core import (
+    EARTH_RADIUS_MILES, AdsbCore, RollingHistogram, SampleHistory, SpatialGrid, range_and_bearing,
+)
+
+try:
+    from haversine import haversine, Unit
+except ImportError:
+    haversine = None
+
+
+def reference_distance(a, b):
+    """Great-circle distance in miles, from the haversine package if it is installed."""
+    if haversine is not None:
+        return haversine(a, b, unit=Unit.MILES)
+    phi1, phi2 = math.radians(a[0]), math.radians(b[0])
+    h = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(b[1] - a[1]) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(h))
+
+
+# --- Headless Core ---
+
+def test_core_processes_snapshots_without_a_display():
+    core = AdsbCore(max_track_points=3, ref_points=[(37.9555, -121.6978)], history_samples=100)
+    for now in range(4):
+        core.process({'now': now, 'aircraft': [
+            {'hex': 'a00001', 'flight': 'UAL1  ', 'lat': 38.0 + now / 100, 'lon': -121.7,
+             'alt_baro': 12000, 'gs': 250},
+            {'hex': 'a00002', 'lat': 37.9, 'lon': -121.6, 'alt_baro': 'ground', 'gs': 'N/A'},
+            {'hex': 'a00003', 'alt_baro': 30000}, # No position
+        ]})
+    snap = core.snapshot
+    assert snap.hex == ['a00001', 'a00002']
+    assert snap.flight == ['UAL1', 'N/A']
+    assert snap.alt.tolist() == [12000, 0] and snap.on_ground.tolist() == [False, True]
+    assert np.isnan(snap.gs[1])
+    assert snap.dist[0] == pytest.approx(reference_distance((37.9555, -121.6978), (38.03, -121.7)))
+    # Tracks keep the last max_track_points positions
+    assert core.tracks.view('a00001')[:, 0].tolist() == pytest.approx([38.01, 38.02, 38.03])
+    assert len(core.history) == 8
+    assert core.alt_hist.counts.sum() == 8 and core.gs_hist.counts.sum() == 4
+
+    # Aircraft that leave the feed lose their tracks
+    core.process({'now': 4, 'aircraft': []})
+    assert len(core.tracks) == 0
+
+
+# --- Sample History ---
+
+def test_history_fills_then_overwrites_the_oldest():
+    history = SampleHistory(4)
+    evicted = history.extend([1, 2, 3], [10, 20, 30], [100, None, 300])
+    assert len(history) == 3
+    assert all(len(column) == 0 for column in evicted)
+    assert np.isnan(history.groundspeeds[1])
+
+    evicted = history.extend([4, 5], [40, 50], [400, 500])
+    assert len(history) == 4
+    assert evicted[0].tolist() == [1]
+    assert sorted(history.distances.tolist()) == [2, 3, 4, 5]
+    assert sorted(history.altitudes.tolist()) == [20, 30, 40, 50]
+
+
+def test_history_batch_larger_than_capacity_keeps_the_newest():
+    history = SampleHistory(3)
+    history.extend([1], [1], [1])
+    evicted = history.extend([2, 3, 4, 5, 6], [2, 3, 4, 5, 6], [2, 3, 4, 5, 6])
+    assert evicted[0].tolist() == [1]
+    assert sorted(history.distances.tolist()) == [4, 5, 6]
+
+
+# --- Rolling Histogram ---
+
+def test_rolling_histogram_matches_rebinning_the_history():
+    rng = np.random.default_rng(1)
+    history = SampleHistory(50)
+    hist = RollingHistogram(10, (0, 50000))
+    for _ in range(20):
+        altitudes = rng.uniform(-1000, 60000, 7)
+        altitudes[0] = np.nan
+        evicted = history.extend(np.zeros(7), altitudes, np.zeros(7))
+        hist.remove(evicted[1])
+        hist.add(altitudes)
+    altitudes = history.altitudes[~np.isnan(history.altitudes)]
+    expected, _ = np.histogram(altitudes, bins=10, range=(0, 50000))
+    assert hist.counts.tolist() == expected.tolist()
+
+
+# --- Geodesy ---
+
+def test_range_and_bearing_matches_haversine():
+    refs = [(37.9555, -121.6978), (38.85144, -77.037721)]
+    points = [(37.6189, -122.375), (40.6413, -73.7781), (-33.9399, 151.1753), (37.9555, -121.6978)]
+    distance, bearing = range_and_bearing([r[0] for r in refs], [r[1] for r in refs],
+                                          [p[0] for p in points], [p[1] for p in points])
+    assert distance.shape == bearing.shape == (2, 4)
+    for i, ref in enumerate(refs):
+        for j, point in enumerate(points):
+            assert distance[i, j] == pytest.approx(reference_distance(ref, point), rel=1e-6, abs=1e-9)
+    assert distance[0, 3] == 0
+
+
+def test_range_and_bearing_compass_directions():
+    _, bearing = range_and_bearing([0], [0], [1, 0, -1, 0], [0, 1, 0, -1])
+    assert bearing[0].tolist() == pytest.approx([0, 90, 180, 270])
+
+
+# --- Spatial Index ---
+
+def brute_force(points, south, west, north, east):
+    return {key for key, (lat, lon) in points.items() if south <= lat <= north and west <= lon <= east}
+
+
+def test_query_returns_every_point_in_the_box():
+    rng = np.random.default_rng(2)
+    keys = [f'a{i:05x}' for i in range(300)]
+    lats = rng.uniform(36, 40, len(keys))
+    lons = rng.uniform(-124, -119, len(keys))
+    grid = SpatialGrid(0.25)
+    grid.set_points(keys, lats, lons)
+    points = dict(zip(keys, zip(lats.tolist(), lons.tolist())))
+    for box in [(37.1, -122.3, 37.6, -121.2), (30, -130, 45, -110), (38.0, -120.0, 38.0, -120.0)]:
+        found = grid.query(*box)
+        assert brute_force(points, *box) <= found
+        # A superset only to within one cell
+        south, west, north, east = box
+        grown = (south - 0.25, west - 0.25, north + 0.25, east + 0.25)
+        assert found <= brute_force(points, *grown)
+
+
+def test_grid_moves_discards_and_retains_keys():
+    grid = SpatialGrid(1.0)
+    grid.set_points(['a', 'b', 'c'], [10.5, 20.5, np.nan], [10.5, 20.5, 0])
+    assert grid.query(10, 10, 11, 11) == {'a'}
+    assert grid.query(-90, -180, 90, 180) == {'a', 'b'}
+
+    grid.set_points(['a'], [20.2], [20.2])
+    assert grid.query(10, 10, 10.9, 10.9) == set()
+    assert grid.query(20, 20, 21, 21) == {'a', 'b'}
+
+    grid.set('track', [10.5, 12.5], [10.5, 12.5])
+    grid.add_points(['track'], [14.5], [14.5])
+    assert grid.query(12, 12, 12.9, 12.9) == {'track'}
+    assert grid.query(14, 14, 14.9, 14.9) == {'track'}
+
+    grid.discard('b')
+    grid.retain(['a', 'track'])
+    assert grid.query(-90, -180, 90, 180) == {'a', 'track'}
+    assert len(grid) == 2
+    # Emptied cells are dropped from the index
+    assert grid.query(10, 10, 10.9, 10.9) == {'track'}
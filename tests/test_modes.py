@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+
+from ADSB_core import (
+    AircraftStateTable, AvrStreamPoller, BeastStreamPoller, ModeSDecoder, make_feed_poller, modes_crc,
+)
+
+# Published example frames (ICAO 4840d6 identification, 40621d airborne
+# position even/odd pair at 38000 ft, 485020 airborne velocity)
+IDENT = '8D4840D6202CC371C32CE0576098'
+POS_EVEN = '8D40621D58C382D690C8AC2863A7'
+POS_ODD = '8D40621D58C386435CC412692AD6'
+VELOCITY = '8D485020994409940838175B284F'
+
+
+def frames(*hex_frames):
+    return np.frombuffer(bytes.fromhex(''.join(hex_frames)), dtype=np.uint8).reshape(-1, 14)
+
+
+def with_altitude_field(hex_frame, a12):
+    """The frame with ME bits 9-20 (the altitude field) replaced, and its CRC recomputed."""
+    frame = bytearray.fromhex(hex_frame)
+    me = int.from_bytes(frame[4:11], 'big')
+    me = (me & ~(0xFFF << 36)) | (a12 << 36)
+    frame[4:11] = me.to_bytes(7, 'big')
+    crc = int(modes_crc(np.frombuffer(bytes(frame), dtype=np.uint8).reshape(1, 14))[0])
+    frame[11:14] = crc.to_bytes(3, 'big')
+    return frame.hex()
+
+
+def decode(hex_frames, receiver=None, now=0.0):
+    decoder = ModeSDecoder(receiver)
+    table = AircraftStateTable()
+    decoder.decode(frames(*hex_frames), now, table)
+    return decoder, table
+
+
+# --- Mode-S Decoding ---
+
+def test_crc_of_valid_frames_matches_their_parity():
+    good = frames(IDENT, POS_EVEN, POS_ODD, VELOCITY)
+    parity = (good[:, 11].astype(np.uint32) << 16) | (good[:, 12].astype(np.uint32) << 8) | good[:, 13]
+    assert modes_crc(good).tolist() == parity.tolist()
+
+
+def test_corrupted_frame_is_dropped():
+    corrupt = bytearray.fromhex(IDENT)
+    corrupt[6] ^= 0x10
+    decoder, table = decode([corrupt.hex(), VELOCITY])
+    assert decoder.crc_errors == 1 and decoder.frames == 2
+    assert list(table.aircraft) == ['485020']
+
+
+def test_identification_and_velocity():
+    _, table = decode([IDENT, VELOCITY])
+    assert table.aircraft['4840d6']['flight'] == 'KLM1023'
+    ac = table.aircraft['485020']
+    assert ac['gs'] == pytest.approx(159.2, abs=0.1)
+    assert ac['track'] == pytest.approx(182.9, abs=0.1)
+    assert ac['baro_rate'] == -832
+
+
+def test_even_odd_pair_gives_a_global_position():
+    decoder, table = decode([POS_ODD, POS_EVEN])
+    ac = table.aircraft['40621d']
+    assert ac['alt_baro'] == 38000
+    assert ac['lat'] == pytest.approx(52.2572, abs=1e-4)
+    assert ac['lon'] == pytest.approx(3.9194, abs=1e-4)
+    # The aircraft's own position is now the reference for single messages
+    assert '40621d' in decoder.positions
+
+
+def test_single_message_is_decoded_relative_to_the_receiver():
+    _, table = decode([POS_EVEN], receiver=(52.0, 4.0))
+    ac = table.aircraft['40621d']
+    assert ac['lat'] == pytest.approx(52.2572, abs=1e-3)
+    assert ac['lon'] == pytest.approx(3.9194, abs=1e-3)
+
+    # Without a receiver a lone message has no position yet
+    _, table = decode([POS_EVEN])
+    assert 'lat' not in table.aircraft['40621d']
+
+
+@pytest.mark.parametrize('a12', [0, 0xC38 & ~0x10])
+def test_position_without_a_decodable_altitude_reports_none(a12):
+    # a12 = 0: no altitude; Q bit clear: Gillham-coded altitude, not decoded
+    _, table = decode([with_altitude_field(POS_ODD, a12), with_altitude_field(POS_EVEN, a12)])
+    ac = table.aircraft['40621d']
+    assert 'alt_baro' not in ac
+    assert ac['lat'] == pytest.approx(52.2572, abs=1e-4)
+
+
+def test_altitude_field_helper_round_trips():
+    assert with_altitude_field(POS_EVEN, 0xC38).upper() == POS_EVEN
+
+
+# --- Raw Streams ---
+
+def beast_frame(hex_frame, timestamp=b'\x00\x1a\x00\x00\x00\x01', signal=b'\x1a'):
+    """A long Mode-S frame in Beast binary format, with 0x1a bytes doubled."""
+    data = timestamp + signal + bytes.fromhex(hex_frame)
+    return b'\x1a3' + data.replace(b'\x1a', b'\x1a\x1a')
+
+
+# Beast receiver status frame, with an escaped 0x1a followed by '3' in its data
+BEAST_STATUS = b'\x1a4' + (bytes(7) + b'\x1a3' + bytes(12)).replace(b'\x1a', b'\x1a\x1a')
+
+
+def test_avr_lines_decode_and_keep_the_partial_line():
+    poller = AvrStreamPoller('localhost')
+    buffer = f'*{IDENT};\n@0000000000AB{VELOCITY};\n*{POS_EVEN[:10]}'.encode()
+    assert poller.decode(buffer, 0.0) == f'*{POS_EVEN[:10]}'.encode()
+    assert poller.table.aircraft['4840d6']['flight'] == 'KLM1023'
+    assert '485020' in poller.table.aircraft
+
+
+def test_beast_frames_decode_and_skip_other_types():
+    poller = BeastStreamPoller('localhost')
+    mode_ac = b'\x1a1' + bytes(9)
+    short = b'\x1a2' + bytes(14)
+    buffer = (mode_ac + beast_frame(IDENT) + short + BEAST_STATUS + beast_frame(VELOCITY)
+              + BEAST_STATUS)
+    assert poller.decode(buffer, 0.0) == b''
+    assert sorted(poller.table.aircraft) == ['4840d6', '485020']
+    assert poller.decoder.frames == 2
+
+
+def test_beast_frame_split_anywhere_across_polls():
+    raw = beast_frame(IDENT) + BEAST_STATUS + beast_frame(VELOCITY)
+    for cut in range(1, len(raw)):
+        poller = BeastStreamPoller('localhost')
+        rest = poller.decode(raw[:cut], 0.0)
+        rest = poller.decode(rest + raw[cut:], 1.0)
+        assert rest == b'', cut
+        assert sorted(poller.table.aircraft) == ['4840d6', '485020'], cut
+        assert poller.table.messages == 2, cut
+
+
+def test_mode_s_feeds_get_the_receiver():
+    poller = make_feed_poller('beast://127.0.0.1', receiver=(52.0, 4.0))
+    assert isinstance(poller, BeastStreamPoller) and poller.port == 30005
+    assert poller.decoder.receiver == (52.0, 4.0)
+    assert make_feed_poller('avr://127.0.0.1:30002').decoder.receiver is None
@@ -0,0 +1,89 @@
+import json
+import os
+
+from ADSB_snapshot_log import SnapshotRecorder, log_files, read_recording, read_snapshot_log
+
+
+def snapshot(now, count=2):
+    """A small aircraft.json document, as raw bytes."""
+    aircraft = [{'hex': f'a{i:05x}', 'lat': 37.9 + i, 'lon': -121.7, 'alt_baro': 1000 * i}
+                for i in range(count)]
+    return json.dumps({'now': now, 'messages': 1, 'aircraft': aircraft}).encode()
+
+
+def test_recorder_round_trip(tmp_path):
+    payloads = [(1000.0 + k, snapshot(1000.0 + k, k)) for k in range(5)]
+    recorder = SnapshotRecorder(str(tmp_path))
+    for received, payload in payloads:
+        recorder.write(payload, received)
+    recorder.close()
+
+    assert recorder.written == 5 and recorder.dropped == 0 and recorder.errors == 0
+    assert list(read_snapshot_log(str(tmp_path))) == payloads
+
+
+def test_rotated_files_are_read_back_in_order(tmp_path):
+    payloads = [(1000.0 + 10 * k, snapshot(1000.0 + 10 * k)) for k in range(3)]
+    recorder = SnapshotRecorder(str(tmp_path), rotate_bytes=1)
+    for received, payload in payloads:
+        recorder.write(payload, received)
+    recorder.close()
+
+    assert len(log_files(str(tmp_path))) == 3
+    assert list(read_recording(str(tmp_path))) == payloads
+
+
+def test_rotation_within_one_second_starts_new_files(tmp_path):
+    payloads = [(1000.0, snapshot(float(k), k)) for k in range(12)]
+    recorder = SnapshotRecorder(str(tmp_path), rotate_bytes=1)
+    for received, payload in payloads:
+        recorder.write(payload, received)
+    recorder.close()
+
+    assert len(log_files(str(tmp_path))) == 12
+    assert list(read_recording(str(tmp_path))) == payloads
+
+
+def test_truncated_final_record_is_skipped(tmp_path):
+    recorder = SnapshotRecorder(str(tmp_path))
+    recorder.write(snapshot(1.0), 1.0)
+    recorder.write(snapshot(2.0), 2.0)
+    recorder.close()
+
+    path = log_files(str(tmp_path))[0]
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert [received for received, _ in read_snapshot_log(path)] == [1.0]
+
+
+def test_write_error_is_counted_and_recording_goes_on(tmp_path):
+    recorder = SnapshotRecorder(str(tmp_path))
+    write = recorder._write
+    calls = []
+
+    def failing_write(received, payload):
+        calls.append(received)
+        if len(calls) == 1:
+            raise OSError("No space left on device")
+        write(received, payload)
+
+    recorder._write = failing_write
+    for k in range(3):
+        recorder.write(snapshot(1000.0 + k), 1000.0 + k)
+    recorder.close()
+
+    assert recorder.errors == 1 and recorder.written == 2
+    assert [received for received, _ in read_snapshot_log(str(tmp_path))] == [1001.0, 1002.0]
+
+
+def test_close_after_close_returns(tmp_path):
+    recorder = SnapshotRecorder(str(tmp_path))
+    recorder.close()
+    recorder.close(timeout=0.1)
+    assert not recorder.thread.is_alive()
+
+
+def test_json_folder_is_replayed_by_now_stamp(tmp_path):
+    for name, now in [('b.json', 20.0), ('a.json', 30.0), ('c.json', 10.0)]:
+        (tmp_path / name).write_bytes(snapshot(now))
+    assert [stamp for stamp, _ in read_recording(str(tmp_path))] == [10.0, 20.0, 30.0]
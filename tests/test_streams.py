@@ -0,0 +1,96 @@
+import socket
+
+import ADSB_core
+from ADSB_core import SbsStreamPoller, StreamPoller, make_feed_poller
+
+
+def sbs_line(kind, hex_code, callsign='', alt='', gs='', track='', lat='', lon='',
+             vrate='', squawk='', ground='0'):
+    """One SBS-1 MSG line, as dump1090 sends it on port 30003."""
+    parts = ['MSG', str(kind), '1', '1', hex_code.upper(), '1',
+             '2026/10/18', '12:00:00.000', '2026/10/18', '12:00:00.000',
+             callsign, alt, gs, track, lat, lon, vrate, squawk, '0', '0', '0', ground]
+    return (','.join(parts) + '\r\n').encode()
+
+
+# --- SBS-1 ---
+
+def test_sbs_messages_merge_into_one_aircraft():
+    poller = SbsStreamPoller('localhost')
+    buffer = (sbs_line(1, 'a1b2c3', callsign='UAL123  ')
+              + sbs_line(3, 'a1b2c3', alt='35000', lat='37.5', lon='-121.9')
+              + sbs_line(4, 'a1b2c3', gs='451.5', track='270.0', vrate='-640')
+              + sbs_line(6, 'a1b2c3', squawk='1200'))
+    assert poller.decode(buffer, 100.0) == b''
+
+    data = poller.table.to_json(101.0)
+    assert data['messages'] == 4
+    (ac,) = data['aircraft']
+    assert ac['hex'] == 'a1b2c3'
+    assert ac['flight'] == 'UAL123  '
+    assert (ac['alt_baro'], ac['lat'], ac['lon']) == (35000, 37.5, -121.9)
+    assert (ac['gs'], ac['track'], ac['baro_rate']) == (451.5, 270.0, -640)
+    assert ac['squawk'] == '1200'
+    assert ac['seen'] == 1.0 and ac['seen_pos'] == 1.0
+
+
+def test_sbs_incomplete_line_is_kept_for_the_next_poll():
+    poller = SbsStreamPoller('localhost')
+    line = sbs_line(3, 'abcdef', alt='1000', lat='38', lon='-77')
+    rest = poller.decode(line[:30], 0.0)
+    assert rest == line[:30] and poller.table.messages == 0
+    assert poller.decode(rest + line[30:], 0.0) == b''
+    assert poller.table.aircraft['abcdef']['lat'] == 38.0
+
+
+def test_sbs_ground_garbled_and_other_lines():
+    poller = SbsStreamPoller('localhost')
+    buffer = (sbs_line(2, 'abc001', alt='25', lat='38', lon='-77', ground='-1')
+              + sbs_line(3, 'abc002', alt='not a number', lat='38', lon='-77')
+              + b'STA,,1,1,ABC003,1,2026/10/18,12:00:00.000,2026/10/18,12:00:00.000,RM\r\n'
+              + b'MSG,3,1,1\r\n'
+              + b'\r\n')
+    poller.decode(buffer, 0.0)
+    assert list(poller.table.aircraft) == ['abc001']
+    assert poller.table.aircraft['abc001']['alt_baro'] == 'ground'
+
+
+def test_state_table_expires_quiet_aircraft():
+    poller = SbsStreamPoller('localhost')
+    poller.table.expire_seconds = 60
+    poller.decode(sbs_line(5, 'abc001', alt='1000') + sbs_line(5, 'abc002', alt='2000'), 0.0)
+    poller.decode(sbs_line(5, 'abc002', alt='2100'), 50.0)
+    data = poller.table.to_json(70.0)
+    assert [ac['hex'] for ac in data['aircraft']] == ['abc002']
+    assert 'seen_pos' not in data['aircraft'][0]
+
+
+def test_quiet_feed_still_expires_aircraft(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ADSB_core.time, 'time', lambda: clock[0])
+    receiver, feed = socket.socketpair()
+    poller = SbsStreamPoller('localhost', expire_seconds=60)
+    poller.sock = receiver
+    receiver.setblocking(False)
+    try:
+        feed.sendall(sbs_line(3, 'abc001', alt='1000', lat='38', lon='-77'))
+        data, _, _, _ = poller.poll()
+        assert [ac['hex'] for ac in data['aircraft']] == ['abc001']
+
+        # Connected but silent: nothing new until the aircraft expires
+        clock[0] += 30
+        assert poller.poll() is None
+        clock[0] += 31
+        data, _, _, _ = poller.poll()
+        assert data['aircraft'] == []
+        assert poller.poll() is None
+    finally:
+        poller.close()
+        feed.close()
+
+
+def test_feed_urls_pick_the_poller():
+    poller = make_feed_poller('sbs://192.168.4.93:30003')
+    assert isinstance(poller, SbsStreamPoller) and isinstance(poller, StreamPoller)
+    assert (poller.host, poller.port) == ('192.168.4.93', 30003)
+    assert make_feed_poller('sbs://192.168.4.93').port == SbsStreamPoller.default_port
@@ -0,0 +1,116 @@
+import numpy as np
+
+from ADSB_core import TrackStore
+
+
+def append_points(store, hex_codes, count, start=0):
+    """Appends count points to each track; point k has lat = k, lon = -k, alt = 100 * k, time = k."""
+    for k in range(start, start + count):
+        store.append(hex_codes, [k] * len(hex_codes), [-k] * len(hex_codes),
+                     [100 * k] * len(hex_codes), float(k))
+
+
+# --- Track Buffers ---
+
+def test_view_is_oldest_first_before_wrapping():
+    store = TrackStore(capacity=5, initial_slots=4)
+    append_points(store, ['a', 'b'], 3)
+    track = store.view('a')
+    assert track.shape == (3, 4)
+    assert track[:, TrackStore.LAT].tolist() == [0, 1, 2]
+    assert track[:, TrackStore.LON].tolist() == [0, -1, -2]
+    assert track[:, TrackStore.ALT].tolist() == [0, 100, 200]
+    assert track[:, TrackStore.TIME].tolist() == [0, 1, 2]
+    assert store.points_written('a') == 3
+
+
+def test_view_keeps_the_newest_points_after_wrapping():
+    store = TrackStore(capacity=4, initial_slots=2)
+    append_points(store, ['a'], 11)
+    track = store.view('a')
+    assert track[:, TrackStore.LAT].tolist() == [7, 8, 9, 10]
+    # Contiguous and zero-copy
+    assert np.shares_memory(track, store.arena)
+    assert store.latest(['a'])[0, TrackStore.LAT] == 10
+
+
+def test_tracks_only_advance_when_appended():
+    store = TrackStore(capacity=4, initial_slots=2)
+    append_points(store, ['a', 'b'], 2)
+    append_points(store, ['b'], 2, start=2)
+    assert store.view('a')[:, TrackStore.LAT].tolist() == [0, 1]
+    assert store.view('b')[:, TrackStore.LAT].tolist() == [0, 1, 2, 3]
+    assert store.latest(['a', 'b'])[:, TrackStore.TIME].tolist() == [1, 3]
+
+
+def test_removed_slots_are_reused_from_scratch():
+    store = TrackStore(capacity=4, initial_slots=2)
+    append_points(store, ['a', 'b'], 3)
+    store.remove('a')
+    assert 'a' not in store and len(store) == 1
+    append_points(store, ['c'], 1, start=7)
+    assert store.view('c')[:, TrackStore.LAT].tolist() == [7]
+    assert len(store.written) == 2 # The freed slot was reused, not a new one
+
+
+def test_arena_grows_without_losing_tracks():
+    store = TrackStore(capacity=3, initial_slots=2)
+    append_points(store, ['a', 'b'], 2)
+    append_points(store, ['a', 'b', 'c', 'd', 'e'], 2, start=2)
+    assert len(store.written) >= 5
+    assert store.view('a')[:, TrackStore.LAT].tolist() == [1, 2, 3]
+    assert store.view('e')[:, TrackStore.LAT].tolist() == [2, 3]
+    assert sorted(store) == ['a', 'b', 'c', 'd', 'e']
+
+
+# --- Eviction ---
+
+def test_evict_drops_tracks_older_than_max_age():
+    store = TrackStore(capacity=4, initial_slots=4)
+    append_points(store, ['old'], 1)
+    append_points(store, ['new'], 1, start=50)
+    dropped = store.evict(now=100.0, max_age=60)
+    assert dropped == {'age': 1, 'count': 0, 'memory': 0}
+    assert sorted(store) == ['new']
+
+
+def test_evict_drops_least_recently_seen_over_max_count():
+    store = TrackStore(capacity=4, initial_slots=4)
+    append_points(store, ['a', 'b', 'c'], 2)
+    append_points(store, ['b', 'c'], 1, start=2)
+    append_points(store, ['b'], 1, start=3)
+    append_points(store, ['d'], 1, start=1) # Last seen with a, but shorter
+    # The tie at t=1 drops the shorter track first
+    dropped = store.evict(now=5.0, max_count=3)
+    assert dropped == {'age': 0, 'count': 1, 'memory': 0}
+    assert sorted(store) == ['a', 'b', 'c']
+    
+    # Then the least recently seen
+    store.evict(now=5.0, max_count=2)
+    assert sorted(store) == ['b', 'c']
+
+
+def test_memory_budget_bounds_the_arena():
+    store = TrackStore(capacity=10, initial_slots=64)
+    max_bytes = 8 * store.slot_bytes()
+    append_points(store, [f'{i:06x}' for i in range(40)], 3)
+    dropped = store.evict(now=3.0, max_bytes=max_bytes)
+    assert dropped['memory'] == 32
+    assert len(store) == 8
+    assert store.nbytes() <= max_bytes
+    
+    # Later growth stays within the budget
+    append_points(store, list(store), 2, start=3)
+    assert store.nbytes() <= max_bytes
+
+
+def test_retain_packs_a_mostly_empty_arena():
+    store = TrackStore(capacity=4, initial_slots=2)
+    hex_codes = [f'{i:06x}' for i in range(64)]
+    append_points(store, hex_codes, 3)
+    grown = store.nbytes()
+    store.retain(hex_codes[:3])
+    assert sorted(store) == hex_codes[:3]
+    assert store.nbytes() < grown
+    for hex_code in hex_codes[:3]:
+        assert store.view(hex_code)[:, TrackStore.LAT].tolist() == [0, 1, 2]